@@ -1,9 +1,12 @@
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
+import asyncio
 import os
 import json
+import weakref
 from pydantic import BaseModel, Field
 from typing import List
 
+import caption_cache
 from logger_config import setup_logger
 logger = setup_logger(__name__)
 
@@ -11,6 +14,26 @@ logger = setup_logger(__name__)
 CAPTION_PROVIDER = os.environ.get("CAPTION_PROVIDER", "gemini").lower()
 GEMINI_MODEL_DEFAULT = "gemini-2.0-flash"
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "YOUR KEY HERE")
+CLAUDE_MODEL_DEFAULT = "claude-3-5-haiku-latest"
+ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY", "")
+# Second provider used when the first fails or is slow; "none" disables failover.
+# Claude is only the default fallback when an Anthropic key is configured.
+CAPTION_FALLBACK_PROVIDER = os.environ.get(
+    "CAPTION_FALLBACK_PROVIDER",
+    "gemini" if CAPTION_PROVIDER != "gemini" else ("claude" if ANTHROPIC_API_KEY else "none"),
+).lower()
+
+# Async caption API limits
+CAPTION_CONCURRENCY = int(os.environ.get("FS_CAPTION_CONCURRENCY", "4"))
+CAPTION_RATE_PER_SEC = float(os.environ.get("FS_CAPTION_RATE", "2"))       # request starts per second, 0 = unlimited
+CAPTION_TIMEOUT = float(os.environ.get("FS_CAPTION_TIMEOUT", "30"))        # seconds per provider request
+CAPTION_HEDGE_AFTER = float(os.environ.get("FS_CAPTION_HEDGE_AFTER", "8"))  # start the fallback if the first is slower; 0 = failover only
+# Bump whenever PROMPT_TEMPLATE changes so cached captions are not reused
+PROMPT_VERSION = "1"
+BODY_CHARS = 900
+# Posts per batched postworthiness request, and body chars sent per post
+SCREEN_BATCH_SIZE = int(os.environ.get("FS_SCREEN_BATCH_SIZE", "20"))
+SCREEN_BODY_CHARS = 400
 
 
 class CaptionResponse(BaseModel):
@@ -19,51 +42,184 @@ class CaptionResponse(BaseModel):
     postworthy: bool = Field(description="True if meme-worthy content")
 
 
+class ScreeningVerdict(BaseModel):
+    id: str = Field(description="Post id exactly as given")
+    postworthy: bool = Field(description="True if meme-worthy content")
+
+
+class ScreeningResponse(BaseModel):
+    verdicts: List[ScreeningVerdict] = Field(description="One verdict per post")
+
+
+# Providers whose SDK could not be set up (e.g. not installed); not retried or re-logged per caption
+_init_failed = set()
+
+
+def _new_client(provider: str, use_async: bool = False):
+    if provider in _init_failed:
+        return None
+    try:
+        if provider == "gemini":
+            from google.genai import Client
+            client = Client(api_key=GEMINI_API_KEY)
+            return client.aio if use_async else client
+        import anthropic
+        cls = anthropic.AsyncAnthropic if use_async else anthropic.Anthropic
+        return cls(api_key=ANTHROPIC_API_KEY or None)
+    except Exception as e:
+        logger.error(f"{provider.title()} init failed: {e}")
+        _init_failed.add(provider)
+        return None
+
+
 _gemini_client = None
 
 
 def _init_gemini_client():
     global _gemini_client
-    if _gemini_client:
-        return _gemini_client
-    try:
-        from google.genai import Client
-        _gemini_client = Client(api_key=GEMINI_API_KEY)
-    except Exception as e:
-        logger.error(f"Gemini init failed: {e}")
-        _gemini_client = None
+    if _gemini_client is None:
+        _gemini_client = _new_client("gemini")
     return _gemini_client
 
 
-def _generate_with_gemini(prompt: str, model_name: str):
+def _gemini_config(response_model):
+    return {
+        "response_mime_type": "application/json",
+        "response_json_schema": response_model.model_json_schema(),
+    }
+
+
+def _generate_with_gemini(prompt: str, model_name: str, response_model=CaptionResponse):
     client = _init_gemini_client()
     if client is None:
         raise RuntimeError("Gemini client unavailable")
 
-    config = {
-        "response_mime_type": "application/json",
-        "response_json_schema": CaptionResponse.model_json_schema(),
-    }
-
     resp = client.models.generate_content(
         model=model_name,
         contents=prompt,
-        config=config,
+        config=_gemini_config(response_model),
+    )
+
+    return response_model.model_validate_json(resp.text)
+
+
+_claude_client = None
+
+
+def _init_claude_client():
+    global _claude_client
+    if _claude_client is None:
+        _claude_client = _new_client("claude")
+    return _claude_client
+
+
+def _claude_messages(prompt: str):
+    return [{"role": "user", "content": prompt + "\nRespond with the JSON object only."}]
+
+
+def _parse_claude(resp, response_model):
+    text = "".join(getattr(block, "text", "") for block in resp.content)
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("No JSON object in Claude response")
+    return response_model.model_validate_json(text[start:end + 1])
+
+
+def _generate_with_claude(prompt: str, model_name: str, response_model=CaptionResponse):
+    client = _init_claude_client()
+    if client is None:
+        raise RuntimeError("Claude client unavailable")
+
+    resp = client.messages.create(model=model_name, max_tokens=1024, messages=_claude_messages(prompt))
+    return _parse_claude(resp, response_model)
+
+
+# Async SDK clients hold connections bound to the event loop that created them
+_async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _async_client(provider: str):
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if provider not in clients:
+        clients[provider] = _new_client(provider, use_async=True)
+    if clients[provider] is None:
+        raise RuntimeError(f"{provider.title()} client unavailable")
+    return clients[provider]
+
+
+async def _close_async_clients():
+    for client in _async_clients.pop(asyncio.get_running_loop(), {}).values():
+        close = getattr(client, "aclose", None) or getattr(client, "close", None)
+        if close is not None:
+            try:
+                await close()
+            except Exception as e:
+                logger.debug(f"Closing async caption client failed: {e}")
+
+
+async def _agenerate_with_gemini(prompt: str, model_name: str, response_model=CaptionResponse):
+    resp = await _async_client("gemini").models.generate_content(
+        model=model_name,
+        contents=prompt,
+        config=_gemini_config(response_model),
     )
+    return response_model.model_validate_json(resp.text)
+
+
+async def _agenerate_with_claude(prompt: str, model_name: str, response_model=CaptionResponse):
+    resp = await _async_client("claude").messages.create(
+        model=model_name, max_tokens=1024, messages=_claude_messages(prompt)
+    )
+    return _parse_claude(resp, response_model)
+
+
+PROVIDERS = {
+    "gemini": (_generate_with_gemini, GEMINI_MODEL_DEFAULT),
+    "claude": (_generate_with_claude, CLAUDE_MODEL_DEFAULT),
+}
+ASYNC_PROVIDERS = {
+    "gemini": _agenerate_with_gemini,
+    "claude": _agenerate_with_claude,
+}
+
+
+def _provider_chain():
+    chain = [CAPTION_PROVIDER if CAPTION_PROVIDER in PROVIDERS else "gemini"]
+    if CAPTION_FALLBACK_PROVIDER in PROVIDERS and CAPTION_FALLBACK_PROVIDER not in chain:
+        chain.append(CAPTION_FALLBACK_PROVIDER)
+    return chain
+
+
+def warm_up():
+    """Create the provider clients up front (for the long-running daemon)."""
+    inits = {"gemini": _init_gemini_client, "claude": _init_claude_client}
+    for provider in _provider_chain():
+        inits[provider]()
+
+
+def _generate(prompt: str, response_model=CaptionResponse):
+    """Try each provider in turn; returns (model_name, parsed) or raises the last error."""
+    last_error = None
+    for provider in _provider_chain():
+        fn, model_name = PROVIDERS[provider]
+        try:
+            return model_name, fn(prompt, model_name, response_model)
+        except Exception as e:
+            logger.warning(f"Caption provider {provider} failed: {e}")
+            last_error = e
+    raise last_error
 
-    parsed = CaptionResponse.model_validate_json(resp.text)
+
+def _caption_tuple(parsed: CaptionResponse) -> Tuple[str, str, bool]:
     caption = parsed.caption.strip()
     hashtags = " ".join(f"#{h.lstrip('#')}" for h in parsed.hashtags)
     postworthy = parsed.postworthy
     return caption, hashtags, postworthy
 
 
-def generate_caption(post: Dict) -> Tuple[str, str, bool]:
-    title = post.get("title", "") or ""
-    text = (post.get("text") or "")[:900]
-    subreddit = post.get("subreddit", "")
+POSTWORTHY_RULES = "false if boring, non-meme, political, announcement posts, or people posting if they are looking for something, discard these immediately and send postworthy as false, also too serious posts including strong sexual themes, keep a strong moderation, the page should be mature and funny and hence you should determine the postworthiness accordingly."
 
-    prompt = f"""
+PROMPT_TEMPLATE = """
 Write IG caption for “Fielding Set”.
 
 Rules:
@@ -76,7 +232,7 @@ Rules:
 Return JSON:
 - caption
 - hashtags: 6-12 relevant IG tags without '#' prefix and some viral ones that will boost engagement.
-- postworthy: false if boring, non-meme, political, announcement posts, or people posting if they are looking for something, discard these immediately and send postworthy as false, also too serious posts including strong sexual themes, keep a strong moderation, the page should be mature and funny and hence you should determine the postworthiness accordingly.
+- postworthy: """ + POSTWORTHY_RULES + """
 
 Content:
 Title: {title}
@@ -84,12 +240,210 @@ Body: {text}
 Source: {subreddit}
 """
 
+
+FALLBACK_CAPTION = (
+    "Fielding Set: what would you do? 🤔",
+    "#FieldingSet #desidating #relationships",
+    False
+)
+
+
+def _caption_inputs(post: Dict) -> Tuple[str, str, str]:
+    title = post.get("title", "") or ""
+    text = (post.get("text") or "")[:BODY_CHARS]
+    subreddit = post.get("subreddit", "")
+    return title, text, subreddit
+
+
+def _cache_lookup(post: Dict, inputs) -> Optional[Tuple[str, str, bool]]:
+    try:
+        for provider in _provider_chain():
+            key = caption_cache.cache_key(PROMPT_VERSION, PROVIDERS[provider][1], *inputs)
+            cached = caption_cache.get(key)
+            if cached is not None:
+                logger.debug(f"Caption cache hit for {post.get('id', '?')}")
+                return _caption_tuple(CaptionResponse.model_validate_json(cached))
+    except Exception as e:
+        logger.warning(f"Caption cache read failed: {e}")
+    return None
+
+
+def _cache_store(model_name: str, inputs, parsed: CaptionResponse):
+    try:
+        key = caption_cache.cache_key(PROMPT_VERSION, model_name, *inputs)
+        caption_cache.put(key, parsed.model_dump_json())
+    except Exception as e:
+        logger.warning(f"Caption cache write failed: {e}")
+
+
+def generate_caption(post: Dict) -> Tuple[str, str, bool]:
+    inputs = _caption_inputs(post)
+    cached = _cache_lookup(post, inputs)
+    if cached is not None:
+        return cached
+
+    title, text, subreddit = inputs
+    prompt = PROMPT_TEMPLATE.format(title=title, text=text, subreddit=subreddit)
+
     try:
-        return _generate_with_gemini(prompt, GEMINI_MODEL_DEFAULT)
+        model_name, parsed = _generate(prompt)
     except Exception as e:
         logger.warning(f"Caption fallback: {e}")
-        return (
-            "Fielding Set: what would you do? 🤔",
-            "#FieldingSet #desidating #relationships",
-            False
+        return FALLBACK_CAPTION
+
+    _cache_store(model_name, inputs, parsed)
+    return _caption_tuple(parsed)
+
+
+class AsyncRateLimiter:
+    """Spaces request starts at least 1/rate seconds apart (rate <= 0 means unlimited)."""
+
+    def __init__(self, rate: float = CAPTION_RATE_PER_SEC):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+
+async def _call_provider(provider: str, prompt: str, limiter: Optional[AsyncRateLimiter], timeout: float):
+    _, model_name = PROVIDERS[provider]
+    if limiter is not None:
+        await limiter.wait()
+    # Native async SDK call, so a timeout or a lost hedge really cancels the request
+    parsed = await asyncio.wait_for(ASYNC_PROVIDERS[provider](prompt, model_name), timeout)
+    return model_name, parsed
+
+
+async def generate_caption_async(
+    post: Dict,
+    limiter: Optional[AsyncRateLimiter] = None,
+    timeout: float = CAPTION_TIMEOUT,
+    hedge_after: float = CAPTION_HEDGE_AFTER,
+) -> Tuple[str, str, bool]:
+    """
+    Async generate_caption. The first provider gets `hedge_after` seconds before
+    the fallback provider is started alongside it; the first valid answer wins.
+    A provider that errors or exceeds `timeout` fails over immediately. Requests
+    go through the SDKs' async clients, so the losing request is cancelled.
+    """
+    inputs = _caption_inputs(post)
+    cached = _cache_lookup(post, inputs)
+    if cached is not None:
+        return cached
+
+    title, text, subreddit = inputs
+    prompt = PROMPT_TEMPLATE.format(title=title, text=text, subreddit=subreddit)
+    chain = _provider_chain()
+    pending = set()
+    launched = 0
+
+    def launch():
+        nonlocal launched
+        pending.add(asyncio.create_task(_call_provider(chain[launched], prompt, limiter, timeout)))
+        launched += 1
+
+    launch()
+    while pending:
+        can_hedge = hedge_after > 0 and launched < len(chain)
+        done, _ = await asyncio.wait(
+            pending, timeout=hedge_after if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
         )
+        if not done:
+            logger.info(f"Caption provider slow for {post.get('id', '?')}, hedging with {chain[launched]}")
+            launch()
+            continue
+
+        for task in done:
+            pending.discard(task)
+            try:
+                model_name, parsed = task.result()
+            except Exception as e:
+                logger.warning(f"Caption provider failed for {post.get('id', '?')}: {e!r}")
+                continue
+            for other in pending:
+                other.cancel()
+            _cache_store(model_name, inputs, parsed)
+            return _caption_tuple(parsed)
+
+        if not pending and launched < len(chain):
+            launch()
+
+    logger.warning(f"Caption fallback for {post.get('id', '?')}: all providers failed")
+    return FALLBACK_CAPTION
+
+
+async def generate_captions(
+    posts: List[Dict],
+    concurrency: int = CAPTION_CONCURRENCY,
+    rate: float = CAPTION_RATE_PER_SEC,
+) -> List[Tuple[str, str, bool]]:
+    """Caption many posts at once, at most `concurrency` in flight and `rate` starts/sec. Order is kept."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = AsyncRateLimiter(rate)
+
+    async def one(post):
+        async with semaphore:
+            return await generate_caption_async(post, limiter)
+
+    try:
+        return await asyncio.gather(*(one(p) for p in posts))
+    finally:
+        await _close_async_clients()
+
+
+SCREEN_PROMPT_TEMPLATE = """
+Screen Reddit posts for the IG meme page “Fielding Set”.
+
+For every post return its id and postworthy.
+postworthy: """ + POSTWORTHY_RULES + """
+
+Return JSON:
+- verdicts: one entry per post with id (exactly as given) and postworthy
+
+Posts:
+{posts}
+"""
+
+
+def _screen_batch(posts: List[Dict]) -> Dict[str, bool]:
+    blocks = []
+    for p in posts:
+        blocks.append(
+            f"id: {p.get('id', '')}\n"
+            f"Title: {p.get('title', '') or ''}\n"
+            f"Body: {(p.get('text') or '')[:SCREEN_BODY_CHARS]}\n"
+            f"Source: {p.get('subreddit', '')}"
+        )
+    prompt = SCREEN_PROMPT_TEMPLATE.format(posts="\n---\n".join(blocks))
+    _, parsed = _generate(prompt, ScreeningResponse)
+
+    wanted = {p.get("id") for p in posts}
+    return {v.id: v.postworthy for v in parsed.verdicts if v.id in wanted}
+
+
+def screen_posts(posts: List[Dict], batch_size: int = SCREEN_BATCH_SIZE) -> Tuple[Dict[str, bool], int]:
+    """
+    Ask the LLM for postworthy verdicts on many posts at once, batch_size per request.
+    Returns ({post_id: postworthy}, number of failed batches); posts from failed
+    batches (or ids the LLM left out) are simply missing from the verdicts.
+    """
+    verdicts: Dict[str, bool] = {}
+    failed = 0
+    for i in range(0, len(posts), batch_size):
+        batch = posts[i:i + batch_size]
+        try:
+            verdicts.update(_screen_batch(batch))
+        except Exception as e:
+            failed += 1
+            logger.warning(f"Screening batch failed ({len(batch)} posts): {e}")
+    logger.info(f"Screened {len(posts)} posts: {sum(verdicts.values())} postworthy, {len(verdicts) - sum(verdicts.values())} rejected")
+    return verdicts, failed
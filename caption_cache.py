@@ -0,0 +1,77 @@
+"""
+Persistent cache for LLM caption results.
+Keys are content hashes of everything that shapes the prompt, values are the
+validated CaptionResponse JSON. Entries expire after CAPTION_CACHE_TTL and the
+least-recently-used ones are evicted past CAPTION_CACHE_MAX_ENTRIES.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+CAPTION_CACHE_FILE = os.environ.get("FS_CAPTION_CACHE_FILE", ".cache/captions.db")
+CAPTION_CACHE_TTL = int(os.environ.get("FS_CAPTION_CACHE_TTL", str(30 * 24 * 3600)))
+CAPTION_CACHE_MAX_ENTRIES = int(os.environ.get("FS_CAPTION_CACHE_MAX_ENTRIES", "5000"))
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+
+
+def cache_key(*parts) -> str:
+    """Stable hash of the prompt inputs (template version, model, content...)."""
+    blob = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        Path(CAPTION_CACHE_FILE).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CAPTION_CACHE_FILE, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS captions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_captions_used ON captions (used_at)")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def get(key: str) -> Optional[str]:
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        row = conn.execute("SELECT value, created_at FROM captions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        with conn:
+            if now - created_at > CAPTION_CACHE_TTL:
+                conn.execute("DELETE FROM captions WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE captions SET used_at = ? WHERE key = ?", (now, key))
+        return value
+
+
+def put(key: str, value: str):
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO captions (key, value, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            conn.execute("DELETE FROM captions WHERE created_at < ?", (now - CAPTION_CACHE_TTL,))
+            conn.execute(
+                "DELETE FROM captions WHERE key IN ("
+                "SELECT key FROM captions ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (CAPTION_CACHE_MAX_ENTRIES,),
+            )
@@ -1,16 +1,25 @@
 import csv
 csv.field_size_limit(10_000_000)
 
+import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from bisect import bisect_left, insort
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 CSV_FILE = "reddit_posts.csv"
 
+# Journal mode: state changes are appended to CSV_FILE + ".journal" and folded
+# back into the CSV snapshot every JOURNAL_COMPACT_EVERY records.
+CSV_JOURNAL = os.environ.get("FS_CSV_JOURNAL", "").lower() in ("1", "true", "yes")
+JOURNAL_COMPACT_EVERY = int(os.environ.get("FS_CSV_JOURNAL_COMPACT", "500"))
+
 FIELDS = [
     "id", "fullname", "title", "text", "timestamp_utc",
     "votes", "comments", "shares", "posted", "permalink",
     "subreddit", "score", "origin", "type", "final_score",
-    "has_image", "image_url", "discarded"
+    "has_image", "image_url", "discarded", "preview_url",
+    "postworthy", "rescore_at", "media_pk"
 ]
 
 
@@ -20,75 +29,335 @@ def ensure_file_exists():
             csv.DictWriter(f, fieldnames=FIELDS).writeheader()
 
 
-def read_all():
+def is_candidate(r) -> bool:
+    return (
+        r.get("posted", "").lower() != "true"
+        and r.get("discarded", "false").lower() != "true"
+    )
+
+
+class CandidateIndex:
+    """
+    Unposted, undiscarded rows kept sorted by final_score (highest first).
+    Ties keep file order, matching the old stable sort in get_unposted.
+    """
+
+    def __init__(self):
+        self._keys: List[Tuple[float, int]] = []   # (-final_score, row position)
+        self._by_id: Dict[str, List[Tuple[float, int]]] = {}
+
+    def add(self, pos: int, row: Dict[str, Any]):
+        if not is_candidate(row):
+            return
+        key = (-safe_float(row.get("final_score")), pos)
+        insort(self._keys, key)
+        self._by_id.setdefault(row["id"], []).append(key)
+
+    def remove(self, pid: str):
+        for key in self._by_id.pop(pid, []):
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def top(self, limit: Optional[int] = None, min_score: float = 0.0,
+            accept: Optional[Callable[[int], bool]] = None) -> List[int]:
+        """Row positions with final_score >= min_score, best first, at most `limit`."""
+        out = []
+        for neg_score, pos in self._keys:
+            if -neg_score < min_score or (limit is not None and len(out) >= limit):
+                break
+            if accept is None or accept(pos):
+                out.append(pos)
+        return out
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def rescore_due_at(row: Dict[str, Any]) -> float:
+    """When the row's recency bucket next changes; missing means due now (legacy rows)."""
+    return safe_float(row.get("rescore_at"))
+
+
+class RescoreIndex:
+    """Candidate rows ordered by the time their score next needs recomputing."""
+
+    def __init__(self):
+        self._keys: List[Tuple[float, int]] = []   # (rescore_at, row position)
+        self._by_id: Dict[str, List[Tuple[float, int]]] = {}
+
+    def add(self, pos: int, row: Dict[str, Any]):
+        if not is_candidate(row):
+            return
+        due = rescore_due_at(row)
+        if due == float("inf"):
+            return
+        key = (due, pos)
+        insort(self._keys, key)
+        self._by_id.setdefault(row["id"], []).append(key)
+
+    def remove(self, pid: str):
+        for key in self._by_id.pop(pid, []):
+            i = bisect_left(self._keys, key)
+            if i < len(self._keys) and self._keys[i] == key:
+                del self._keys[i]
+
+    def due(self, now: float, limit: Optional[int] = None) -> List[int]:
+        """Row positions whose rescore_at is before `now`, oldest first."""
+        end = bisect_left(self._keys, (now, -1))
+        if limit is not None:
+            end = min(end, limit)
+        return [pos for _, pos in self._keys[:end]]
+
+
+class _State:
+    def __init__(self, rows: List[Dict[str, Any]], signature):
+        self.rows = rows
+        self.signature = signature
+        self.positions: Dict[str, List[int]] = {}
+        self.index = CandidateIndex()
+        self.rescore = RescoreIndex()
+        self.journal_records = 0
+        self.journal_torn = False
+        for pos, r in enumerate(rows):
+            self._track(pos, r)
+
+    def _track(self, pos: int, r: Dict[str, Any]):
+        self.positions.setdefault(r["id"], []).append(pos)
+        self.index.add(pos, r)
+        self.rescore.add(pos, r)
+
+    def append(self, r: Dict[str, Any]):
+        self.rows.append(r)
+        self._track(len(self.rows) - 1, r)
+
+    def set_field(self, pid: str, field: str, value: str) -> bool:
+        positions = self.positions.get(pid)
+        if not positions:
+            return False
+        for pos in positions:
+            self.rows[pos][field] = value
+        # Re-key the row in both indexes (drops it if it is no longer a candidate)
+        self.index.remove(pid)
+        self.rescore.remove(pid)
+        for pos in positions:
+            self.index.add(pos, self.rows[pos])
+            self.rescore.add(pos, self.rows[pos])
+        return True
+
+    def apply(self, rec: Dict[str, Any]):
+        """Replay one journal record; safe to apply twice."""
+        op = rec.get("op")
+        if op == "add":
+            row = rec["row"]
+            if row["id"] not in self.positions:
+                self.append(row)
+        elif op == "set":
+            self.set_field(rec["id"], rec["field"], rec["value"])
+
+
+_state: Optional[_State] = None
+# Guards _state so stage worker threads can share the store
+_lock = threading.RLock()
+
+
+def journal_path() -> str:
+    return CSV_FILE + ".journal"
+
+
+def _stat_signature(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _file_signature():
+    return (_stat_signature(CSV_FILE), _stat_signature(journal_path()))
+
+
+def _replay_journal(state: _State):
+    path = journal_path()
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = f.read()
+    state.journal_torn = bool(data) and not data.endswith("\n")
+    for line in data.splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue  # torn write from a crash mid-append
+        state.apply(rec)
+        state.journal_records += 1
+
+
+def _load() -> _State:
+    """Return cached rows + candidate index, re-reading only if the files changed on disk."""
+    global _state
     ensure_file_exists()
-    with open(CSV_FILE, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    sig = _file_signature()
+    if _state is None or _state.signature != sig:
+        with open(CSV_FILE, "r", encoding="utf-8") as f:
+            state = _State(list(csv.DictReader(f)), sig)
+        _replay_journal(state)
+        _state = state
+    return _state
+
+
+def read_all():
+    with _lock:
+        return [dict(r) for r in _load().rows]
 
 
 def write_all(rows):
+    """Atomically replace the CSV snapshot and drop the (now folded) journal."""
+    global _state
     ensure_file_exists()
-    with open(CSV_FILE, "w", newline="", encoding="utf-8") as f:
+    tmp = CSV_FILE + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
         w = csv.DictWriter(f, fieldnames=FIELDS)
         w.writeheader()
         w.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, CSV_FILE)
+    if os.path.exists(journal_path()):
+        os.remove(journal_path())
+    _state = None
+
+
+def compact():
+    """Fold the journal into the CSV snapshot."""
+    global _state
+    with _lock:
+        state = _load()
+        write_all(state.rows)
+        state.journal_records = 0
+        state.journal_torn = False
+        state.signature = _file_signature()
+        _state = state
+
+
+def _append_journal(state: _State, records: List[Dict[str, Any]]):
+    with open(journal_path(), "a", encoding="utf-8") as f:
+        if state.journal_torn:
+            f.write("\n")
+            state.journal_torn = False
+        for rec in records:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    state.journal_records += len(records)
+
+
+def _flush(state: _State, records: List[Dict[str, Any]]):
+    """Persist a change already applied to `state` and keep the in-memory index valid."""
+    global _state
+    if not CSV_JOURNAL:
+        write_all(state.rows)
+    elif records:
+        _append_journal(state, records)
+        if state.journal_records >= JOURNAL_COMPACT_EVERY:
+            compact()
+            return
+    state.signature = _file_signature()
+    _state = state
+
+
+def post_to_row(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a fetched post dict into a storage row keyed by FIELDS."""
+    st = p.get("stats", {})
+    return {
+        "id": p["id"],
+        "fullname": p.get("fullname", ""),
+        "title": p.get("title", ""),
+        "text": p.get("text", ""),
+        "timestamp_utc": p.get("timestamp_utc", ""),
+        "votes": st.get("votes", 0),
+        "comments": st.get("comments", 0),
+        "shares": st.get("shares", 0),
+        "posted": "False",
+        "permalink": p.get("permalink", ""),
+        "subreddit": p.get("subreddit", ""),
+        "score": p.get("score", 0),
+        "origin": p.get("origin", ""),
+        "type": p.get("type", ""),
+        "final_score": p.get("final_score", ""),
+        "has_image": str(p.get("has_image", False)),
+        "image_url": p.get("image_url", ""),
+        "discarded": str(p.get("discarded", False)),
+        "preview_url": p.get("preview_url", ""),
+        "postworthy": "",
+        "rescore_at": p.get("rescore_at", ""),
+        "media_pk": "",
+    }
 
 
 def add_posts(posts: List[Dict[str, Any]]):
-    rows = read_all()
-    ids = {r["id"] for r in rows}
-    new = []
-
-    for p in posts:
-        if p["id"] in ids: 
-            continue
-        st = p.get("stats", {})
-        new.append({
-            "id": p["id"],
-            "fullname": p.get("fullname", ""),
-            "title": p.get("title", ""),
-            "text": p.get("text", ""),
-            "timestamp_utc": p.get("timestamp_utc", ""),
-            "votes": st.get("votes", 0),
-            "comments": st.get("comments", 0),
-            "shares": st.get("shares", 0),
-            "posted": "False",
-            "permalink": p.get("permalink", ""),
-            "subreddit": p.get("subreddit", ""),
-            "score": p.get("score", 0),
-            "origin": p.get("origin", ""),
-            "type": p.get("type", ""),
-            "final_score": p.get("final_score", ""),
-            "has_image": str(p.get("has_image", False)),
-            "image_url": p.get("image_url", ""),
-            "discarded": str(p.get("discarded", False)),
-        })
-
-    write_all(rows + new)
-    return new
-
-
-def mark_posted(pid):
-    rows = read_all()
-    changed = False
-    for r in rows:
-        if r["id"] == pid:
-            r["posted"] = "True"
-            changed = True
-    if changed: write_all(rows)
-    return changed
+    with _lock:
+        state = _load()
+        new = []
+
+        for p in posts:
+            if p["id"] in state.positions: 
+                continue
+            row = {k: "" if v is None else str(v) for k, v in post_to_row(p).items()}
+            state.append(row)
+            new.append(row)
+
+        _flush(state, [{"op": "add", "row": r} for r in new])
+        return new
+
+
+def _set_flag(post_id: str, field: str) -> bool:
+    with _lock:
+        state = _load()
+        if not state.set_field(post_id, field, "True"):
+            return False
+        _flush(state, [{"op": "set", "id": post_id, "field": field, "value": "True"}])
+        return True
+
+
+def record_verdicts(verdicts: Dict[str, bool]) -> int:
+    """
+    Store LLM postworthy verdicts in one write. Posts judged not postworthy
+    are also discarded. Returns how many rows were updated.
+    """
+    with _lock:
+        state = _load()
+        records = []
+        for pid, ok in verdicts.items():
+            if not state.set_field(pid, "postworthy", str(bool(ok))):
+                continue
+            records.append({"op": "set", "id": pid, "field": "postworthy", "value": str(bool(ok))})
+            if not ok:
+                state.set_field(pid, "discarded", "True")
+                records.append({"op": "set", "id": pid, "field": "discarded", "value": "True"})
+        if records:
+            _flush(state, records)
+        return sum(1 for r in records if r["field"] == "postworthy")
+
+
+def mark_posted(pid, media_pk: str = ""):
+    """Set posted=True, and record the Instagram media pk when given."""
+    if not media_pk:
+        return _set_flag(pid, "posted")
+    with _lock:
+        state = _load()
+        if not state.set_field(pid, "posted", "True"):
+            return False
+        state.set_field(pid, "media_pk", str(media_pk))
+        _flush(state, [
+            {"op": "set", "id": pid, "field": "posted", "value": "True"},
+            {"op": "set", "id": pid, "field": "media_pk", "value": str(media_pk)},
+        ])
+        return True
 
 
 def mark_discarded(post_id: str) -> bool:
-    rows = read_all()
-    updated = False
-    for r in rows:
-        if r["id"] == post_id:
-            r["discarded"] = "True"
-            updated = True
-    if updated:
-        write_all(rows)
-    return updated
+    return _set_flag(post_id, "discarded")
 
 
 def safe_float(v):
@@ -98,17 +367,41 @@ def safe_float(v):
         return 0.0
 
 
-def get_unposted(limit: Optional[int] = None, min_score: float = 0.0):
-    rows = read_all()
+def get_unposted(limit: Optional[int] = None, min_score: float = 0.0, screened: Optional[bool] = None):
+    """
+    Candidate rows (not posted/discarded, final_score >= min_score), best first.
+    Served from the in-memory CandidateIndex; `limit` caps how many rows are returned.
+    screened=True keeps only rows screened as postworthy, screened=False only
+    rows without a verdict yet.
+    """
+    with _lock:
+        state = _load()
+        accept = None
+        if screened is not None:
+            def accept(pos):
+                verdict = (state.rows[pos].get("postworthy") or "").lower()
+                return verdict == "true" if screened else verdict == ""
+        return [dict(state.rows[pos]) for pos in state.index.top(limit, min_score, accept)]
+
 
-    def is_unposted(r):
-        return (
-            r.get("posted", "").lower() != "true"
-            and r.get("discarded", "false").lower() != "true"
-            and safe_float(r.get("final_score")) >= min_score
-        )
+def get_due_rescore(now: float, limit: Optional[int] = None):
+    """Candidate rows whose recency bucket changed before `now`, served from the RescoreIndex."""
+    with _lock:
+        state = _load()
+        return [dict(state.rows[pos]) for pos in state.rescore.due(now, limit)]
 
-    unposted = [r for r in rows if is_unposted(r)]
-    unposted.sort(key=lambda r: safe_float(r.get("final_score")), reverse=True)
 
-    return unposted
+def update_scores(updates: Dict[str, Tuple[float, float]]) -> int:
+    """Set {id: (final_score, rescore_at)} in one write. Returns how many rows were updated."""
+    with _lock:
+        state = _load()
+        records = []
+        for pid, (score, rescore_at) in updates.items():
+            if not state.set_field(pid, "final_score", str(score)):
+                continue
+            state.set_field(pid, "rescore_at", str(rescore_at))
+            records.append({"op": "set", "id": pid, "field": "final_score", "value": str(score)})
+            records.append({"op": "set", "id": pid, "field": "rescore_at", "value": str(rescore_at)})
+        if records:
+            _flush(state, records)
+        return len(records) // 2
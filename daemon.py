@@ -0,0 +1,121 @@
+"""
+Long-running scheduler mode: `python daemon.py [--staged] [--ready-queue]`.
+
+Keeps one process alive so the Instagram session, LLM clients, render pool
+and the store's in-memory index stay warm between posting slots. Posting
+runs on a schedule (FS_DAEMON_SLOTS or every FS_DAEMON_INTERVAL minutes)
+while a background thread refreshes Reddit data every FS_DAEMON_REFRESH minutes.
+"""
+
+import os
+import signal
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import caption
+import pipeline
+import render
+from instagram import InstagramClient
+
+# Local posting times, e.g. "09:00,13:30,19:00"; empty means every DAEMON_INTERVAL_MINUTES
+DAEMON_SLOTS = os.environ.get("FS_DAEMON_SLOTS", "")
+DAEMON_INTERVAL_MINUTES = int(os.environ.get("FS_DAEMON_INTERVAL", "240"))
+DAEMON_REFRESH_MINUTES = int(os.environ.get("FS_DAEMON_REFRESH", "30"))
+
+
+def parse_slots(spec: str) -> List[Tuple[int, int]]:
+    slots = []
+    for part in spec.split(","):
+        part = part.strip()
+        if part:
+            hour, minute = part.split(":")
+            slots.append((int(hour), int(minute)))
+    return sorted(slots)
+
+
+def next_slot(now: datetime, slots: List[Tuple[int, int]], interval_minutes: int,
+              last: Optional[datetime] = None) -> datetime:
+    """Next posting time after `now`: the next listed slot, or `interval_minutes` after the last run."""
+    if not slots:
+        if last is None:
+            return now
+        return max(now, last + timedelta(minutes=interval_minutes))
+    for day in range(2):
+        base = (now + timedelta(days=day)).replace(second=0, microsecond=0)
+        for hour, minute in slots:
+            at = base.replace(hour=hour, minute=minute)
+            if at > now:
+                return at
+    return now  # unreachable with at least one slot
+
+
+def warm_up() -> InstagramClient:
+    """Build everything a posting slot needs once, up front."""
+    ig = InstagramClient()
+    caption.warm_up()
+    render.warm_up()
+    pipeline.store.get_unposted(limit=1)  # loads the store and its candidate index
+    return ig
+
+
+def refresh_loop(stop: threading.Event, prepare: bool = False):
+    while not stop.is_set():
+        try:
+            pipeline.refresh_data()
+            if prepare:
+                pipeline.prepare()
+        except Exception:
+            print(f"❌ Background refresh failed:\n{traceback.format_exc()}")
+        stop.wait(DAEMON_REFRESH_MINUTES * 60)
+
+
+def post_slot(ig: InstagramClient, uploader, staged: bool = False, ready: bool = False):
+    if ready and pipeline.publish(ig, uploader):
+        return
+    if staged:
+        pipeline.run_staged(ig, uploader)
+    else:
+        pipeline.main(ig, uploader)
+
+
+def run(staged: bool = False, ready: bool = False):
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    ig = warm_up()
+    # One uploader for the whole process; failed uploads retry between slots
+    uploader = pipeline.start_uploader(ig)
+    slots = parse_slots(DAEMON_SLOTS)
+    threading.Thread(target=refresh_loop, args=(stop, ready), name="refresh", daemon=True).start()
+
+    last = None
+    while not stop.is_set():
+        at = next_slot(datetime.now(), slots, DAEMON_INTERVAL_MINUTES, last)
+        print(f"🕒 Next posting slot at {at:%Y-%m-%d %H:%M}")
+        if stop.wait(max((at - datetime.now()).total_seconds(), 0)):
+            break
+        last = datetime.now()
+        try:
+            post_slot(ig, uploader, staged, ready)
+        except Exception:
+            print(f"❌ Posting slot failed:\n{traceback.format_exc()}")
+
+    print("👋 Daemon stopped")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from logger_config import init_logging
+
+    init_logging()
+
+    parser = argparse.ArgumentParser(description="Run the pipeline on a schedule in one long-lived process")
+    parser.add_argument("--staged", action="store_true", help="use the staged pipeline for each posting slot")
+    parser.add_argument("--ready-queue", action="store_true",
+                        help="prepare posts in the background and publish from the ready queue at each slot")
+    args = parser.parse_args()
+    run(staged=args.staged, ready=args.ready_queue)
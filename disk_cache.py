@@ -0,0 +1,146 @@
+"""
+Shared on-disk HTTP cache used by image_cache.py and response_cache.py.
+
+Each entry is a body file plus a JSON meta file (URL, ETag, Last-Modified,
+fetched_at), named by a hash of the URL. Entries younger than the caller's
+TTL are served without a request, older ones are revalidated with a
+conditional GET, and the least-recently-used entries are evicted once the
+bodies grow past max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import http_client
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class DiskCache:
+    def __init__(self, directory: Path, suffix: str, max_bytes: int, extra_meta: Optional[dict] = None):
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.extra_meta = extra_meta or {}
+
+    def paths(self, url: str) -> Tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}{self.suffix}", self.directory / f"{key}.json"
+
+    def read(self, url: str):
+        """
+        (meta, body), or (None, None) if there is no complete entry or it was
+        written with different extra_meta (e.g. before a setting was toggled).
+        """
+        body_path, meta_path = self.paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None, None
+        if any(meta.get(k) != v for k, v in self.extra_meta.items()):
+            return None, None
+        return meta, body
+
+    def write(self, url: str, body: bytes, headers):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        body_path, meta_path = self.paths(url)
+        meta = dict(
+            self.extra_meta,
+            url=url,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
+        _write_atomic(body_path, body)
+        _write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+        self.evict()
+
+    def touch(self, url: str):
+        """Mark an entry as recently used for LRU eviction."""
+        for path in self.paths(url):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def revalidated(self, url: str, meta: dict):
+        _, meta_path = self.paths(url)
+        _write_atomic(meta_path, json.dumps(dict(meta, fetched_at=time.time())).encode("utf-8"))
+        self.touch(url)
+
+    def evict(self, max_bytes: int = None):
+        """Drop least-recently-used entries until the bodies fit in max_bytes."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if not self.directory.exists():
+            return
+
+        entries = []
+        total = 0
+        for body_path in self.directory.glob(f"*{self.suffix}"):
+            try:
+                st = body_path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, body_path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, body_path in entries:
+            if total <= max_bytes:
+                break
+            for path in (body_path, body_path.with_suffix(".json")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+
+    def fetch(self, url: str, ttl: float, headers: Optional[dict] = None,
+              prepare: Callable[[bytes], Optional[bytes]] = None) -> Tuple[int, Optional[bytes]]:
+        """
+        (status, body) for `url`, from disk when possible.
+
+        Fresh entries and 304 revalidations come back as (200, cached body). A 200
+        response is passed through `prepare` (which may rewrite it, or return None
+        to leave it uncached) and stored. Any other status comes back with the
+        stale body, or None. On a network error a stale body is served as
+        (200, body), otherwise the error propagates.
+        """
+        meta, body = self.read(url)
+        if meta is not None and time.time() - meta.get("fetched_at", 0) < ttl:
+            self.touch(url)
+            return 200, body
+
+        headers = dict(headers or {})
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            res = http_client.get(url, headers=headers)
+        except Exception:
+            if body is None:
+                raise
+            return 200, body
+
+        if res.status_code == 304 and meta is not None:
+            self.revalidated(url, meta)
+            return 200, body
+        if res.status_code == 200:
+            content = prepare(res.content) if prepare else res.content
+            if content is None:
+                return 200, res.content
+            self.write(url, content, res.headers)
+            return 200, content
+        return res.status_code, body
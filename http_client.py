@@ -0,0 +1,213 @@
+"""
+Shared HTTP client for the Redditory pipeline.
+Keeps one pooled requests.Session so reddit.py and render.py reuse
+keep-alive connections instead of doing a fresh TCP+TLS handshake per call.
+Requests are paced by a token bucket per host that follows Reddit's
+X-Ratelimit-* headers and backs off on 429.
+"""
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional
+from urllib.parse import urlsplit
+
+# requests is imported in build_session(): runs that never touch the network skip its import cost
+if TYPE_CHECKING:
+    import requests
+
+USER_AGENT = "FieldingSetBot/1.0"
+DEFAULT_TIMEOUT = 10
+
+# Number of per-host pools kept alive (reddit.com, i.redd.it, preview.redd.it, ...)
+POOL_CONNECTIONS = int(os.environ.get("FS_HTTP_POOL_CONNECTIONS", "8"))
+# Connections kept per host; keep this >= reddit.FETCH_CONCURRENCY
+POOL_MAXSIZE = int(os.environ.get("FS_HTTP_POOL_MAXSIZE", "16"))
+MAX_RETRIES = max(0, int(os.environ.get("FS_HTTP_MAX_RETRIES", "3")))
+BACKOFF_FACTOR = float(os.environ.get("FS_HTTP_BACKOFF", "0.5"))
+# 429 is handled by the per-host rate limiter below, not by urllib3
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# Default per-host pace until the server tells us its budget
+RATE_PER_SEC = float(os.environ.get("FS_HTTP_RATE", "5"))
+RATE_BURST = int(os.environ.get("FS_HTTP_BURST", "10"))
+# Longest we wait on a 429 without a Retry-After/Reset hint
+MAX_BACKOFF = 60.0
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class RateLimited(Exception):
+    """A host kept answering 429 after MAX_RETRIES backoffs, or is paused for longer than MAX_BACKOFF."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"rate limited by {host}, retry after {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Per-host request budget. Starts at RATE_PER_SEC/RATE_BURST and re-paces
+    itself from X-Ratelimit-Remaining/Reset so the remaining budget is spread
+    over the reset window; a 429 pauses the host with exponential backoff.
+    """
+
+    def __init__(self, rate: float = RATE_PER_SEC, burst: int = RATE_BURST, host: str = ""):
+        self.host = host
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.strikes = 0
+        self.server_paced = False
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """
+        Block until a request may be sent. Raises RateLimited instead of waiting
+        when the host is paused (by a 429 or an exhausted X-Ratelimit budget)
+        for longer than MAX_BACKOFF.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                if self.paused_until - now > MAX_BACKOFF:
+                    raise RateLimited(self.host, self.paused_until - now)
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0)
+            time.sleep(min(max(wait, 0.01), MAX_BACKOFF))
+
+    def observe(self, headers):
+        """Re-pace from the server's advertised budget; a no-op for hosts without the headers."""
+        remaining = _header_float(headers, "X-Ratelimit-Remaining")
+        reset = _header_float(headers, "X-Ratelimit-Reset")
+        if remaining is None or reset is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            reset = max(reset, 1.0)
+            if remaining < 1:
+                self.paused_until = max(self.paused_until, now + reset)
+                self.tokens = 0.0
+            else:
+                self.rate = remaining / reset
+                self.server_paced = True
+                # Keep bursts within what the server will still accept
+                self.tokens = min(self.tokens, remaining)
+
+    def succeeded(self):
+        """Clear the 429 streak and, without server hints, creep back to the default pace."""
+        with self._lock:
+            self.strikes = 0
+            if not self.server_paced and self.rate < RATE_PER_SEC:
+                self.rate = min(RATE_PER_SEC, self.rate + RATE_PER_SEC / 10)
+
+    def penalize(self, retry_after: Optional[float]) -> float:
+        """Pause after a 429 and halve the pace. Returns the pause in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.strikes += 1
+            if retry_after is None:
+                retry_after = min(BACKOFF_FACTOR * (2 ** self.strikes), MAX_BACKOFF)
+            self.paused_until = max(self.paused_until, now + retry_after)
+            self.rate = max(self.rate / 2, 0.05)
+            # One probe request once the pause is over, then the slower pace
+            self.tokens = 1.0
+            return retry_after
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def _header_float(headers, name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def get_bucket(host: str) -> TokenBucket:
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(host=host)
+        return bucket
+
+
+def build_session(
+    pool_connections: int = POOL_CONNECTIONS,
+    pool_maxsize: int = POOL_MAXSIZE,
+    max_retries: int = MAX_RETRIES,
+    backoff_factor: float = BACKOFF_FACTOR,
+) -> "requests.Session":
+    """Create a session with pooled keep-alive adapters and retry/backoff on 5xx."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        # Otherwise urllib3 would retry any 429 carrying Retry-After behind the rate limiter's back
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> "requests.Session":
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def get(url: str, timeout: float = DEFAULT_TIMEOUT, **kwargs) -> "requests.Response":
+    """
+    GET through the shared session, paced by the host's TokenBucket.
+    429s are retried up to MAX_RETRIES times with backoff; after that RateLimited is raised.
+    """
+    host = urlsplit(url).hostname or ""
+    bucket = get_bucket(host)
+    for _ in range(MAX_RETRIES + 1):
+        bucket.acquire()
+        res = get_session().get(url, timeout=timeout, **kwargs)
+        bucket.observe(res.headers)
+        if res.status_code != 429:
+            bucket.succeeded()
+            return res
+        retry_after = _header_float(res.headers, "Retry-After")
+        if retry_after is None:
+            retry_after = _header_float(res.headers, "X-Ratelimit-Reset")
+        wait = bucket.penalize(retry_after)
+        if wait > MAX_BACKOFF:
+            break  # not worth blocking the run; let the caller decide
+    raise RateLimited(host, wait)
@@ -0,0 +1,61 @@
+"""
+Disk-backed cache for images fetched by render.py.
+Entries are content-addressed by a hash of the URL, revalidated with
+ETag/Last-Modified once they go stale, and evicted least-recently-used
+when the cache grows past IMAGE_CACHE_MAX_BYTES.
+"""
+
+import io
+import os
+from pathlib import Path
+from typing import Optional
+
+from disk_cache import DiskCache
+
+IMAGE_CACHE_DIR = Path(os.environ.get("FS_IMAGE_CACHE_DIR", ".cache/images"))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get("FS_IMAGE_CACHE_MAX_MB", "512")) * 1024 * 1024
+# Seconds an entry is served without touching the network (Reddit media is effectively immutable)
+IMAGE_CACHE_TTL = int(os.environ.get("FS_IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+# Store a copy downscaled to fit the 1080px canvas instead of the original bytes
+IMAGE_CACHE_DOWNSCALE = os.environ.get("FS_IMAGE_CACHE_DOWNSCALE", "").lower() in ("1", "true", "yes")
+DOWNSCALE_BOX = (1080, 1080)
+
+_cache = DiskCache(IMAGE_CACHE_DIR, ".img", IMAGE_CACHE_MAX_BYTES,
+                   extra_meta={"downscaled": IMAGE_CACHE_DOWNSCALE})
+
+
+def evict(max_bytes: int = None):
+    """Drop least-recently-used entries until the cache fits in max_bytes."""
+    _cache.evict(max_bytes)
+
+
+def _downscale(data: bytes) -> bytes:
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data))
+    if img.width <= DOWNSCALE_BOX[0] and img.height <= DOWNSCALE_BOX[1]:
+        return data
+    img = img.convert("RGB")
+    img.thumbnail(DOWNSCALE_BOX, Image.LANCZOS)
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=95)
+    return out.getvalue()
+
+
+def _prepare(body: bytes) -> bytes:
+    if IMAGE_CACHE_DOWNSCALE:
+        try:
+            return _downscale(body)
+        except Exception:
+            pass  # keep the original bytes if Pillow can't decode it
+    return body
+
+
+def fetch(url: str) -> Optional[bytes]:
+    """
+    Return the image bytes for `url`, from disk when possible.
+    Fresh entries cost no network; stale ones are revalidated with a
+    conditional GET, and served as-is if the network fails.
+    """
+    _, body = _cache.fetch(url, IMAGE_CACHE_TTL, prepare=_prepare)
+    return body
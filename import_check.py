@@ -0,0 +1,86 @@
+"""
+Import-time benchmark and regression check: `python import_check.py`.
+
+Imports each entry module in a fresh interpreter with `-X importtime`, in an
+empty working directory, and fails (exit 1) if:
+- a heavy dependency (PIL, instagrapi, pydantic, ...) is loaded at import,
+- importing creates files (e.g. logs/),
+- the best of IMPORT_RUNS imports takes longer than FS_IMPORT_BUDGET_MS.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+REPO_DIR = Path(__file__).resolve().parent
+# Modules a short "nothing to do" / "fetch only" run imports
+ENTRY_MODULES = ("pipeline",)
+# Only loaded once a post is actually captioned, rendered, scored in bulk or uploaded
+HEAVY_MODULES = ("PIL", "instagrapi", "pydantic", "google.genai", "anthropic", "numpy", "requests", "asyncio")
+IMPORT_BUDGET_MS = float(os.environ.get("FS_IMPORT_BUDGET_MS", "150"))
+IMPORT_RUNS = 5
+
+
+def measure(module: str, cwd: str) -> Tuple[float, Dict[str, int]]:
+    """(total import ms, {imported module: cumulative us}) for one fresh import of `module`."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_DIR), os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr}")
+
+    # Output is post-order: the module's own subtree is the block of nested
+    # lines just before its top-level line (interpreter startup comes earlier)
+    subtree: List[Tuple[str, int]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue  # header line
+        top_level = not name[1:].startswith(" ")
+        if top_level and name.strip() == module:
+            return int(cum) / 1000, dict(subtree + [(module, int(cum))])
+        subtree = [] if top_level else subtree + [(name.strip(), int(cum))]
+    raise RuntimeError(f"no importtime entry for {module}")
+
+
+def check(module: str) -> List[str]:
+    problems = []
+    with tempfile.TemporaryDirectory() as cwd:
+        runs = [measure(module, cwd) for _ in range(IMPORT_RUNS)]
+        created = sorted(os.listdir(cwd))
+    best_ms, cumulative = min(runs, key=lambda r: r[0])
+
+    print(f"import {module}: best {best_ms:.1f} ms of {IMPORT_RUNS} (budget {IMPORT_BUDGET_MS:.0f} ms)")
+    for name, us in sorted(cumulative.items(), key=lambda kv: -kv[1])[:8]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    heavy = [h for h in HEAVY_MODULES if any(n == h or n.startswith(h + ".") for n in cumulative)]
+    if heavy:
+        problems.append(f"{module} imports heavy modules at load: {', '.join(heavy)}")
+    if created:
+        problems.append(f"importing {module} created files: {', '.join(created)}")
+    if best_ms > IMPORT_BUDGET_MS:
+        problems.append(f"import {module} took {best_ms:.1f} ms, over the {IMPORT_BUDGET_MS:.0f} ms budget")
+    return problems
+
+
+def main() -> int:
+    problems = []
+    for module in ENTRY_MODULES:
+        problems.extend(check(module))
+    for p in problems:
+        print(f"❌ {p}")
+    if not problems:
+        print("✅ Import check passed")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
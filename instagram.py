@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from instagrapi import Client
+from instagrapi.exceptions import LoginRequired
 
 
 class InstagramClient:
@@ -8,26 +9,41 @@ class InstagramClient:
         self.cl = Client()
         self.session_path = Path(session_path)
 
-        username = os.environ.get("IG_USERNAME", username)
-        password = os.environ.get("IG_PASSWORD", password)
-        if not username or not password:
+        self.username = os.environ.get("IG_USERNAME", username)
+        self.password = os.environ.get("IG_PASSWORD", password)
+        if not self.username or not self.password:
             raise RuntimeError("IG_USERNAME and IG_PASSWORD must be set in env or passed to InstagramClient.")
 
         if self.session_path.exists():
-            self.cl.load_settings(str(self.session_path))
             try:
-                self.cl.login(username, password)
+                # Reuse the saved session as-is; log in again only if Instagram rejects it
+                self.cl.load_settings(str(self.session_path))
                 return
             except Exception:
-                pass  # fall back to clean login if session invalid
+                pass  # unreadable session file, fall back to clean login
 
-        self.cl.login(username, password)
+        self.login()
+
+    def login(self):
+        """Fresh password login (keeping device ids from the old session), then save the session."""
+        old = self.cl.get_settings()
+        self.cl.set_settings({})
+        if old.get("uuids"):
+            self.cl.set_uuids(old["uuids"])
+        self.cl.login(self.username, self.password)
         self.cl.dump_settings(str(self.session_path))
 
+    def _call(self, fn, *args):
+        try:
+            return fn(*args)
+        except LoginRequired:
+            self.login()
+            return fn(*args)
+
     def upload_photo(self, image_path: str, caption: str) -> str:
-        media = self.cl.photo_upload(image_path, caption)
+        media = self._call(self.cl.photo_upload, image_path, caption)
         return str(media.pk)
     
     def album_upload(self, image_paths: list, caption: str) -> str:
-        media = self.cl.album_upload(image_paths, caption)
+        media = self._call(self.cl.album_upload, image_paths, caption)
         return str(media.pk)
@@ -1,39 +1,49 @@
 """
 Logging configuration module for the Redditory pipeline.
-Sets up structured logging across all modules.
+Modules get their logger from setup_logger(); the console and log-file
+handlers are attached once by init_logging(), which the entry points call,
+so importing a module never touches the filesystem.
 """
 
 import logging
 import logging.handlers
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
 
-# Create logs directory if it doesn't exist
 LOGS_DIR = Path("logs")
-LOGS_DIR.mkdir(exist_ok=True)
-
-# Timestamp for log file
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-LOG_FILE = LOGS_DIR / f"redditory_{timestamp}.log"
+# Set by init_logging()
+LOG_FILE: Optional[Path] = None
 
 
 def setup_logger(name: str) -> logging.Logger:
     """
-    Create and configure a logger for a specific module.
+    Get the logger for a specific module.
     
     Args:
         name: The name of the module (typically __name__)
     
     Returns:
-        Configured logger instance
+        Logger instance; its records reach the handlers installed by init_logging()
     """
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)
-    
-    # Avoid duplicate handlers
-    if logger.hasHandlers():
-        return logger
-    
+    return logger
+
+
+def init_logging(logs_dir: Path = LOGS_DIR) -> Path:
+    """
+    Create the logs directory and a timestamped log file, and attach the
+    console (INFO) and file (DEBUG) handlers. Safe to call more than once.
+    """
+    global LOG_FILE
+    if LOG_FILE is not None:
+        return LOG_FILE
+
+    logs_dir.mkdir(exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    LOG_FILE = logs_dir / f"redditory_{timestamp}.log"
+
     # Create formatter
     formatter = logging.Formatter(
         "[%(asctime)s] [%(name)s] [%(levelname)s] %(message)s",
@@ -44,9 +54,8 @@ def setup_logger(name: str) -> logging.Logger:
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
     
-    # File handler (DEBUG level - captures everything)
+    # File handler (DEBUG level - captures everything from our modules)
     file_handler = logging.handlers.RotatingFileHandler(
         LOG_FILE,
         maxBytes=10_000_000,  # 10 MB
@@ -54,11 +63,12 @@ def setup_logger(name: str) -> logging.Logger:
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    return logger
 
+    # On the root logger so every module logger shares them; third-party
+    # loggers still only pass WARNING and above (the root level)
+    root = logging.getLogger()
+    root.addHandler(console_handler)
+    root.addHandler(file_handler)
 
-# Get a logger for the config module itself
-logger = setup_logger(__name__)
-logger.info(f"Logging initialized. Log file: {LOG_FILE}")
+    setup_logger(__name__).info(f"Logging initialized. Log file: {LOG_FILE}")
+    return LOG_FILE
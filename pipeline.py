@@ -1,14 +1,22 @@
 import os
 from pathlib import Path
 import random
-from typing import List, Tuple
+import threading
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-import csv_store
-from reddit import fetch_popular_posts, fetch_top_comments
-from scorer import compute_final_score
-from caption import generate_caption
-from render import render_post_image
-from instagram import InstagramClient
+import ready_queue
+import storage
+import upload_queue
+from http_client import RateLimited
+from reddit import fetch_popular_posts, fetch_top_comments, save_watermarks
+from scorer import compute_final_score, next_rescore_at, score_posts
+from stages import Stage, run_stages
+
+# caption (pydantic), render (PIL) and instagram (instagrapi) are imported on
+# first use so runs with nothing to do start fast; see import_check.py
+if TYPE_CHECKING:
+    from instagram import InstagramClient
 
 
 SUBREDDITS = [
@@ -18,46 +26,152 @@ SUBREDDITS = [
 PER_SUBREDDIT_LIMIT = 10
 MIN_FINAL_SCORE = 0.6
 POSTS_PER_RUN = 1
+SCREEN_POOL = 40   # best unscreened candidates sent for batched postworthy screening per run
+# After a screening pass with failed batches, wait this long before calling the LLM again
+SCREEN_RETRY_SECONDS = float(os.environ.get("FS_SCREEN_RETRY", "600"))
 OUTPUT_DIR = "out_images"
 
+# Staged mode (--staged): worker threads per stage and queue size between stages
+COMMENT_WORKERS = int(os.environ.get("FS_COMMENT_WORKERS", "2"))
+CAPTION_WORKERS = int(os.environ.get("FS_CAPTION_WORKERS", "2"))
+RENDER_STAGE_WORKERS = int(os.environ.get("FS_RENDER_STAGE_WORKERS", "1"))
+STAGE_QUEUE_SIZE = int(os.environ.get("FS_STAGE_QUEUE_SIZE", "1"))
+# Candidates prepared ahead of the posts still needed; bounds wasted LLM/render work
+STAGE_LOOKAHEAD = int(os.environ.get("FS_STAGE_LOOKAHEAD", "2"))
+# How long a run waits for queued uploads before leaving them to the next run
+UPLOAD_DRAIN_TIMEOUT = float(os.environ.get("FS_UPLOAD_DRAIN_TIMEOUT", "300"))
+
+store = storage.get_backend()
+
 
 def ensure_output_dir():
     Path(OUTPUT_DIR).mkdir(exist_ok=True)
 
 
+# Serializes store refreshes between the posting loop and the daemon's background refresh
+_refresh_lock = threading.Lock()
+
+
+def fetch_new_posts() -> int:
+    """Fetch unseen posts from Reddit, score and store them. Returns how many were fetched."""
+    print("📭 Fetching new data from Reddit…")
+    try:
+        posts, watermarks, limited = fetch_popular_posts(SUBREDDITS, PER_SUBREDDIT_LIMIT)
+    except RateLimited as e:
+        print(f"⏳ Reddit rate limit hit, try again in {e.retry_after:.0f}s")
+        posts, watermarks, limited = [], None, []
+    if limited:
+        print(f"⏳ Reddit rate limit hit, skipped {len(limited)} listings: {', '.join(limited)}")
+    now = time.time()
+    for p in posts:
+        p["final_score"] = compute_final_score(p, now)
+        p["rescore_at"] = next_rescore_at(p.get("timestamp_utc") or 0, now)
+        p.setdefault("discarded", False)
+    store.add_posts(posts)
+    # Only now that the posts are stored may the next fetch skip past them
+    if watermarks is not None:
+        save_watermarks(watermarks)
+    print(f"📌 Stored {len(posts)} posts")
+    return len(posts)
+
+
 def fetch_and_store_if_needed():
-    """Fetch only when CSV has zero usable posts left."""
-    unposted = csv_store.get_unposted(min_score=MIN_FINAL_SCORE)
-    if not unposted:
-        print("📭 Fetching new data from Reddit…")
-        posts = fetch_popular_posts(SUBREDDITS, PER_SUBREDDIT_LIMIT)
-        for p in posts:
-            p["final_score"] = compute_final_score(p)
-            p.setdefault("discarded", False)
-        csv_store.add_posts(posts)
-        print(f"📌 Stored {len(posts)} posts")
-        unposted = csv_store.get_unposted(min_score=MIN_FINAL_SCORE)
-    return unposted
+    """Fetch only when the store has zero usable posts left, then screen new candidates."""
+    with _refresh_lock:
+        rescore_candidates()
+        if not store.get_unposted(limit=1, min_score=MIN_FINAL_SCORE):
+            fetch_new_posts()
+        recorded = screen_candidates()
+        # The whole pool was rejected: screen the next one rather than render unscreened posts
+        while recorded and not store.get_unposted(limit=1, min_score=MIN_FINAL_SCORE, screened=True):
+            recorded = screen_candidates()
 
+    unposted = store.get_unposted(min_score=MIN_FINAL_SCORE, screened=True)
+    if not unposted and recorded is None:
+        # Screening failed or is backing off: fall back to unscreened candidates
+        unposted = store.get_unposted(min_score=MIN_FINAL_SCORE)
+    # Posts already waiting in the upload queue are not candidates again
+    uploading = set(upload_queue.pending_ids())
+    return [r for r in unposted if r["id"] not in uploading]
 
-def build_post_content(row: dict):
-    post = {
+
+def refresh_data():
+    """Rescore, fetch unseen posts and screen them, whether or not candidates are left."""
+    with _refresh_lock:
+        rescore_candidates()
+        fetch_new_posts()
+        screen_candidates()
+
+
+def rescore_candidates():
+    """Recompute final_score only for candidates whose recency bucket changed since the last pass."""
+    now = time.time()
+    due = store.get_due_rescore(now)
+    if not due:
+        return
+    posts = [dict(r, stats={"votes": r.get("votes"), "comments": r.get("comments")}) for r in due]
+    scores = score_posts(posts, now)
+    store.update_scores({
+        r["id"]: (float(score), next_rescore_at(float(r.get("timestamp_utc") or 0), now))
+        for r, score in zip(due, scores)
+    })
+    print(f"♻️ Rescored {len(due)} candidates")
+
+
+# Monotonic time before which screening is skipped because the last pass failed
+_screen_retry_at = 0.0
+
+
+def screen_candidates() -> Optional[int]:
+    """
+    Get batched postworthy verdicts for the best unscreened candidates before any
+    rendering. If a batch fails (e.g. the LLM is down), screening is skipped for
+    SCREEN_RETRY_SECONDS instead of being retried on every pass of the run.
+    Returns how many verdicts were recorded, or None if screening failed or is
+    backing off.
+    """
+    global _screen_retry_at
+    if time.monotonic() < _screen_retry_at:
+        return None
+    pending = store.get_unposted(limit=SCREEN_POOL, min_score=MIN_FINAL_SCORE, screened=False)
+    if not pending:
+        return 0
+    from caption import screen_posts
+
+    verdicts, failed = screen_posts(pending)
+    store.record_verdicts(verdicts)
+    rejected = sum(1 for ok in verdicts.values() if not ok)
+    if rejected:
+        print(f"🗑 Screening rejected {rejected}/{len(pending)} candidates")
+    if failed:
+        _screen_retry_at = time.monotonic() + SCREEN_RETRY_SECONDS
+        print(f"⚠️ {failed} screening batches failed, retrying in {SCREEN_RETRY_SECONDS:.0f}s")
+        return None
+    return len(verdicts)
+
+
+def post_from_row(row: dict) -> dict:
+    has_image = str(row.get("has_image")).lower() == "true"
+    return {
         "id": row["id"],
         "title": row["title"],
         "text": row["text"],
         "subreddit": row["subreddit"],
         "permalink": row["permalink"],
-        "image_url": row["image_url"] if str(row.get("has_image")).lower() == "true" else None,
+        "image_url": row["image_url"] if has_image else None,
+        "preview_url": (row.get("preview_url") or None) if has_image else None,
     }
 
-    img_paths: List[str] = []
-    first_slide = os.path.join(OUTPUT_DIR, f"{post['id']}_1.jpg")
-    render_post_image(post, first_slide)
-    img_paths.append(first_slide)
 
-    # Fetch comments (OPTION A: optional, not required to post)
+def fetch_comments(post: dict) -> List[dict]:
+    # Comments are optional, not required to post
     comments = fetch_top_comments(post["permalink"], limit=15)
-    comments = [c for c in comments if len(c["body"]) >= 25][:8]
+    return [c for c in comments if len(c["body"]) >= 25][:8]
+
+
+def render_post(post: dict, comments: List[dict]) -> List[str]:
+    first_slide = os.path.join(OUTPUT_DIR, f"{post['id']}_1.jpg")
+    jobs: List[Tuple[dict, str]] = [(post, first_slide)]
 
     for idx, c in enumerate(comments, start=2):
         slide_data = {
@@ -68,27 +182,113 @@ def build_post_content(row: dict):
             "image_url": None,
         }
         slide_path = os.path.join(OUTPUT_DIR, f"{post['id']}_{idx}.jpg")
-        render_post_image(slide_data, slide_path)
-        img_paths.append(slide_path)
+        jobs.append((slide_data, slide_path))
+
+    from render import render_slides
+
+    # All slides rendered in parallel, paths come back in slide order
+    return render_slides(jobs)
+
+
+def caption_post(post: dict):
+    """Full caption text, or None if the LLM flags the post as not postworthy."""
+    from caption import generate_caption
+
+    return _full_caption(post, generate_caption(post))
+
 
-    caption, hashtags, postworthy = generate_caption(post)
+def caption_posts(posts: List[dict]) -> List[Optional[str]]:
+    """caption_post for many posts at once through the async caption API. Order is kept."""
+    import asyncio
+
+    from caption import generate_captions
+
+    results = asyncio.run(generate_captions(posts))
+    return [_full_caption(post, result) for post, result in zip(posts, results)]
+
+
+def _full_caption(post: dict, result) -> Optional[str]:
+    caption, hashtags, postworthy = result
     if not postworthy:
         print(f"🗑 AI flagged {post['id']} as NOT postworthy")
         return None
+    return f"{caption}\n\n{hashtags}"
+
+
+def new_instagram_client() -> "InstagramClient":
+    from instagram import InstagramClient
+
+    return InstagramClient()
+
+
+def upload_post(ig: "InstagramClient", img_paths: List[str], caption: str) -> str:
+    print(f"📤 Uploading {len(img_paths)} slides…")
+    if len(img_paths) > 1:
+        return ig.album_upload(img_paths, caption)
+    return ig.upload_photo(img_paths[0], caption)
+
 
-    full_caption = f"{caption}\n\n{hashtags}"
+def start_uploader(ig: "InstagramClient") -> upload_queue.Uploader:
+    """Background uploader for the persistent upload queue; also resumes jobs left by earlier runs."""
+    def on_done(job, media_pk):
+        store.mark_posted(job["id"], media_pk)
+        print(f"✅ Uploaded {job['id']} (media {media_pk})")
+
+    uploader = upload_queue.Uploader(lambda job: upload_post(ig, job["paths"], job["caption"]), on_done)
+    uploader.start()
+    return uploader
+
+
+def finish_uploads(uploader: upload_queue.Uploader):
+    print("⏳ Waiting for queued uploads…")
+    if not uploader.drain(UPLOAD_DRAIN_TIMEOUT):
+        print(f"📮 {len(upload_queue.pending_ids())} uploads still queued, they resume on the next run")
+
+
+def lazy_uploader(ig: "InstagramClient" = None, uploader: upload_queue.Uploader = None):
+    """
+    (get, finish) for a run: get() logs in and starts the uploader on the first
+    upload, so a run with nothing to post never loads instagrapi. finish() drains
+    the uploader if this run started it (or only has jobs left by earlier runs).
+    """
+    own = uploader is None
+    lock = threading.Lock()
+    state = {"ig": ig, "uploader": uploader}
+
+    def get() -> upload_queue.Uploader:
+        with lock:
+            if state["uploader"] is None:
+                state["ig"] = state["ig"] or new_instagram_client()
+                state["uploader"] = start_uploader(state["ig"])
+            return state["uploader"]
+
+    def finish():
+        if own and (state["uploader"] is not None or upload_queue.pending_ids()):
+            finish_uploads(get())
+
+    return get, finish
+
+
+def build_post_content(row: dict):
+    post = post_from_row(row)
+    comments = fetch_comments(post)
+    img_paths = render_post(post, comments)
+
+    full_caption = caption_post(post)
+    if full_caption is None:
+        return None
     return img_paths, full_caption
 
 
-def main():
+def main(ig: "InstagramClient" = None, uploader: upload_queue.Uploader = None):
     ensure_output_dir()
-    posted = 0
+    queued = 0
     attempts = 0
     max_attempts = 10
 
-    ig = InstagramClient()
+    get_uploader, finish = lazy_uploader(ig, uploader)
 
-    while posted < POSTS_PER_RUN and attempts < max_attempts:
+    while queued < POSTS_PER_RUN and attempts < max_attempts:
         attempts += 1
 
         candidates = fetch_and_store_if_needed()
@@ -99,29 +299,187 @@ def main():
         row = random.choice(candidates)
         print(f"🎯 Trying post {row['id']} — {row['title'][:40]}…")
 
-        result = build_post_content(row)
+        try:
+            result = build_post_content(row)
+        except RateLimited as e:
+            print(f"⏳ Reddit rate limit hit while fetching comments, try again in {e.retry_after:.0f}s")
+            break
         if not result:
-            csv_store.mark_discarded(row["id"])
+            store.mark_discarded(row["id"])
             continue
 
         img_paths, caption = result
-        print(f"📤 Uploading {len(img_paths)} slides…")
+        # The uploader thread posts it (with retries) while the next candidate is prepared
+        get_uploader()
+        upload_queue.enqueue(row["id"], img_paths, caption)
+        queued += 1
+        print(f"📮 Queued {queued}/{POSTS_PER_RUN} for upload")
+
+    finish()
+    print("✨ Pipeline complete ✨")
+
+
+def run_staged(ig: "InstagramClient" = None, uploader: upload_queue.Uploader = None):
+    """
+    Same job as main(), but candidate selection, comment fetch, caption/postworthy
+    check, render and upload run as concurrent stages joined by bounded queues,
+    so the next candidate is prepared while the current one uploads.
+    """
+    ensure_output_dir()
+    get_uploader, finish = lazy_uploader(ig, uploader)
+    stop = threading.Event()
+    queued = [0]
+    queued_lock = threading.Lock()
+    # At most POSTS_PER_RUN + STAGE_LOOKAHEAD candidates in flight at once
+    slots = threading.Semaphore(POSTS_PER_RUN + STAGE_LOOKAHEAD)
 
+    def candidates():
+        rows = fetch_and_store_if_needed()
+        if not rows:
+            print("❌ No candidates available after fetch")
+            return
+        random.shuffle(rows)
+        for row in rows[:10 * POSTS_PER_RUN]:
+            while not slots.acquire(timeout=0.5):
+                if stop.is_set():
+                    return
+            if stop.is_set():
+                return
+            print(f"🎯 Trying post {row['id']} — {row['title'][:40]}…")
+            yield {"row": row, "post": post_from_row(row)}
+
+    def comments_stage(job):
         try:
-            if len(img_paths) > 1:
-                ig.album_upload(img_paths, caption)
-            else:
-                ig.upload_photo(img_paths[0], caption)
-        except Exception as e:
-            print(f"❌ Upload failed: {e}")
-            continue
+            job["comments"] = fetch_comments(job["post"])
+        except RateLimited as e:
+            print(f"⏳ Reddit rate limit hit while fetching comments, try again in {e.retry_after:.0f}s")
+            stop.set()
+            return None
+        return job
+
+    def caption_stage(job):
+        job["caption"] = caption_post(job["post"])
+        if job["caption"] is None:
+            store.mark_discarded(job["row"]["id"])
+            return None
+        return job
+
+    def render_stage(job):
+        job["img_paths"] = render_post(job["post"], job["comments"])
+        return job
 
-        csv_store.mark_posted(row["id"])
-        posted += 1
-        print(f"✅ Posted {posted}/{POSTS_PER_RUN}")
+    def upload_stage(job):
+        get_uploader()
+        upload_queue.enqueue(job["row"]["id"], job["img_paths"], job["caption"])
+        with queued_lock:
+            queued[0] += 1
+            print(f"📮 Queued {queued[0]}/{POSTS_PER_RUN} for upload")
+            if queued[0] >= POSTS_PER_RUN:
+                stop.set()
+        return None
 
+    run_stages(
+        candidates(),
+        [
+            Stage("comments", comments_stage, COMMENT_WORKERS),
+            Stage("caption", caption_stage, CAPTION_WORKERS),
+            Stage("render", render_stage, RENDER_STAGE_WORKERS),
+            Stage("upload", upload_stage, 1),  # hands off to the upload queue's single uploader
+        ],
+        queue_size=STAGE_QUEUE_SIZE,
+        stop=stop,
+        on_exit=slots.release,
+    )
+    finish()
     print("✨ Pipeline complete ✨")
 
 
+def prune_ready_queue():
+    live = [r["id"] for r in store.get_unposted()]
+    dropped = ready_queue.prune(live)
+    if dropped:
+        print(f"🧹 Dropped {dropped} stale prepared posts")
+
+
+def prepare(max_attempts: int = 10) -> int:
+    """
+    Fill the on-disk ready queue (up to FS_READY_QUEUE_MAX posts) with captioned,
+    rendered posts so publishing only has to upload. Returns how many were added.
+    """
+    ensure_output_dir()
+    prune_ready_queue()
+    queued = set(ready_queue.ids())
+    candidates = [r for r in fetch_and_store_if_needed() if r["id"] not in queued]
+    random.shuffle(candidates)
+
+    added = 0
+    remaining = candidates[:max_attempts]
+    while remaining and ready_queue.has_room():
+        # Caption one batch per free slot concurrently, then render the postworthy ones
+        room = ready_queue.READY_QUEUE_MAX - len(ready_queue.ids())
+        batch, remaining = remaining[:room], remaining[room:]
+        for row in batch:
+            print(f"🧰 Preparing post {row['id']} — {row['title'][:40]}…")
+        posts = [post_from_row(row) for row in batch]
+        for row, post, full_caption in zip(batch, posts, caption_posts(posts)):
+            if full_caption is None:
+                store.mark_discarded(row["id"])
+                continue
+            try:
+                comments = fetch_comments(post)
+            except RateLimited as e:
+                print(f"⏳ Reddit rate limit hit while fetching comments, try again in {e.retry_after:.0f}s")
+                remaining = []
+                break
+            img_paths = render_post(post, comments)
+            ready_queue.add(row["id"], img_paths, full_caption, final_score=row.get("final_score", ""))
+            added += 1
+
+    print(f"📦 Ready queue: {len(ready_queue.ids())}/{ready_queue.READY_QUEUE_MAX} prepared posts")
+    return added
+
+
+def publish(ig: "InstagramClient" = None, uploader: upload_queue.Uploader = None) -> int:
+    """
+    Hand up to POSTS_PER_RUN posts from the ready queue, oldest first, to the
+    upload queue. Returns how many were queued.
+    """
+    prune_ready_queue()
+    uploading = set(upload_queue.pending_ids())
+    entries = [e for e in ready_queue.entries() if e["id"] not in uploading][:POSTS_PER_RUN]
+    if not entries and not uploading:
+        print("📭 Ready queue is empty, run `pipeline.py prepare` first")
+        return 0
+
+    get_uploader, finish = lazy_uploader(ig, uploader)
+    for entry in entries:
+        get_uploader()
+        upload_queue.enqueue(entry["id"], entry["paths"], entry["caption"])
+        ready_queue.remove(entry["id"])
+        print(f"📮 Queued {entry['id']} for upload")
+    finish()
+    return len(entries)
+
+
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    from logger_config import init_logging
+
+    init_logging()
+
+    parser = argparse.ArgumentParser(description="Reddit to Instagram pipeline")
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "prepare", "publish"],
+                        help="run: fetch, prepare and post in one go (default); "
+                             "prepare: fill the ready queue; publish: upload from the ready queue")
+    parser.add_argument("--staged", action="store_true",
+                        help="run: overlap comment fetch, captioning, rendering and upload across candidates")
+    args = parser.parse_args()
+    if args.command == "prepare":
+        prepare()
+    elif args.command == "publish":
+        publish()
+    elif args.staged:
+        run_staged()
+    else:
+        main()
@@ -0,0 +1,112 @@
+"""
+Bounded on-disk queue of fully prepared posts for `pipeline.py prepare/publish`.
+
+Each entry is a directory READY_DIR/<post id>/ holding the rendered slides
+and a manifest.json (caption, slide files, prepared_at). The manifest is
+written last, so a directory without one is an interrupted prepare and is
+ignored and cleaned up.
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+READY_DIR = Path(os.environ.get("FS_READY_DIR", "ready_posts"))
+READY_QUEUE_MAX = int(os.environ.get("FS_READY_QUEUE_MAX", "5"))
+# Prepared posts older than this are dropped; their captions/slides may be out of date
+READY_MAX_AGE_HOURS = float(os.environ.get("FS_READY_MAX_AGE", "24"))
+
+MANIFEST = "manifest.json"
+# A directory without a manifest this old is a crashed prepare, not one in progress
+INCOMPLETE_GRACE_SECONDS = 600
+
+
+def _entry_dir(post_id: str) -> Path:
+    return READY_DIR / post_id
+
+
+def _read_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads((path / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def entries() -> List[Dict[str, Any]]:
+    """Complete entries, oldest first. Each manifest gets a "paths" list of absolute slide paths."""
+    if not READY_DIR.exists():
+        return []
+    out = []
+    for path in READY_DIR.iterdir():
+        if not path.is_dir():
+            continue
+        manifest = _read_manifest(path)
+        if manifest is None:
+            continue
+        manifest["paths"] = [str(path / name) for name in manifest["slides"]]
+        out.append(manifest)
+    out.sort(key=lambda m: m["prepared_at"])
+    return out
+
+
+def ids() -> List[str]:
+    return [m["id"] for m in entries()]
+
+
+def has_room() -> bool:
+    return len(entries()) < READY_QUEUE_MAX
+
+
+def add(post_id: str, img_paths: List[str], caption: str, **meta) -> Dict[str, Any]:
+    """Move rendered slides into the queue and write the manifest."""
+    path = _entry_dir(post_id)
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+
+    slides = []
+    for i, src in enumerate(img_paths, start=1):
+        name = f"{i}{Path(src).suffix or '.jpg'}"
+        shutil.move(src, path / name)
+        slides.append(name)
+
+    manifest = dict(meta, id=post_id, caption=caption, slides=slides, prepared_at=time.time())
+    tmp = path / f"{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path / MANIFEST)
+    manifest["paths"] = [str(path / name) for name in slides]
+    return manifest
+
+
+def remove(post_id: str):
+    shutil.rmtree(_entry_dir(post_id), ignore_errors=True)
+
+
+def prune(live_ids: Iterable[str], max_age_hours: float = READY_MAX_AGE_HOURS) -> int:
+    """
+    Drop entries whose post is no longer a candidate (posted or discarded since),
+    entries older than max_age_hours, and directories left by a crashed prepare.
+    Returns how many were dropped.
+    """
+    if not READY_DIR.exists():
+        return 0
+    live = set(live_ids)
+    cutoff = time.time() - max_age_hours * 3600
+    dropped = 0
+    for path in READY_DIR.iterdir():
+        if not path.is_dir():
+            continue
+        manifest = _read_manifest(path)
+        if manifest is None:
+            try:
+                stale = time.time() - path.stat().st_mtime > INCOMPLETE_GRACE_SECONDS
+            except OSError:
+                continue
+        else:
+            stale = manifest["id"] not in live or manifest["prepared_at"] < cutoff
+        if stale:
+            shutil.rmtree(path, ignore_errors=True)
+            dropped += 1
+    return dropped
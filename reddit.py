@@ -1,10 +1,31 @@
-import requests
+import os
 import re
 import html
-from typing import List, Dict, Any
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+
+import response_cache
+from http_client import RateLimited
 
 USER_AGENT = "FieldingSetBot/1.0"
 DEFAULT_LIMIT = 10
+# Smallest preview width worth rendering from; previews narrower than this fall back to the source image.
+PREVIEW_MIN_WIDTH = 1080
+# A link post counts as an image post (and gets a preview_url) when its target looks like one of these
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+# Max number of listing requests in flight at once; 1 keeps the old sequential walk.
+FETCH_CONCURRENCY = int(os.environ.get("FS_FETCH_CONCURRENCY", "8"))
+
+# Pages fetched per listing when catching up since the last run
+FETCH_MAX_PAGES = int(os.environ.get("FS_FETCH_MAX_PAGES", "3"))
+# Per subreddit/endpoint watermarks: the most recently seen fullnames
+WATERMARK_FILE = os.environ.get("FS_WATERMARK_FILE", "reddit_watermarks.json")
+WATERMARK_SEEN_MAX = 500
+# Seconds a cached response is reused without even a conditional request
+LISTING_CACHE_TTL = int(os.environ.get("FS_LISTING_CACHE_TTL", "120"))
+COMMENTS_CACHE_TTL = int(os.environ.get("FS_COMMENTS_CACHE_TTL", "900"))
 
 ENDPOINTS = [
     ("hot", "hot.json?limit={limit}"),
@@ -12,16 +33,37 @@ ENDPOINTS = [
 ]
 
 
-def get_json(url: str):
+def get_json(url: str, ttl: float = LISTING_CACHE_TTL):
+    """Parsed JSON, or {} on failure. Raises RateLimited when Reddit keeps answering 429."""
     try:
-        r = requests.get(url, timeout=10, headers={"User-Agent": USER_AGENT})
-        if r.status_code == 200:
-            return r.json()
+        status, data = response_cache.fetch_json(url, ttl, headers={"User-Agent": USER_AGENT})
+        if status == 200 and data is not None:
+            return data
+    except RateLimited:
+        raise
     except:
         pass
     return {}
 
 
+def is_image_url(url: str) -> bool:
+    path = urlsplit(url).path.lower()
+    return path.endswith(IMAGE_EXTENSIONS) or urlsplit(url).hostname in ("i.redd.it", "i.imgur.com")
+
+
+def pick_preview_url(data) -> str:
+    """Smallest Reddit preview resolution at least PREVIEW_MIN_WIDTH wide, or ""."""
+    try:
+        resolutions = data["preview"]["images"][0].get("resolutions", [])
+    except (KeyError, IndexError, TypeError):
+        return ""
+    fitting = [r for r in resolutions if r.get("width", 0) >= PREVIEW_MIN_WIDTH and r.get("url")]
+    if not fitting:
+        return ""
+    best = min(fitting, key=lambda r: r["width"])
+    return html.unescape(best["url"])
+
+
 def extract_post_data(post, subreddit, origin):
     data = post.get("data", {})
 
@@ -38,12 +80,16 @@ def extract_post_data(post, subreddit, origin):
 
     image_url = None
     has_image = False
+    # Reddit previews stand in for image posts only; a link post's preview is
+    # the page thumbnail, and those keep rendering text-only from the link URL
+    use_preview = True
 
     # Source image
     url_override = data.get("url_overridden_by_dest")
     if isinstance(url_override, str) and url_override.startswith("http"):
         image_url = url_override
         has_image = True
+        use_preview = is_image_url(url_override) or data.get("post_hint") == "image"
 
     # Fallback preview
     if not has_image:
@@ -68,27 +114,157 @@ def extract_post_data(post, subreddit, origin):
         "origin": origin,
         "type": "image" if has_image else "text",
         "image_url": image_url,
+        "preview_url": pick_preview_url(data) if has_image and use_preview else "",
         "has_image": has_image,
     }
 
 
-def fetch_subreddit_posts(subreddit: str, limit: int = DEFAULT_LIMIT):
+def listing_url(subreddit: str, ep: str, limit: int, after: str = "") -> str:
+    url = f"https://www.reddit.com/r/{subreddit}/{ep.format(limit=limit)}"
+    return f"{url}&after={after}" if after else url
+
+
+def load_watermarks() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(WATERMARK_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_watermarks(watermarks: Dict[str, Dict[str, Any]]):
+    tmp = WATERMARK_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(watermarks, f)
+    os.replace(tmp, WATERMARK_FILE)
+
+
+def fetch_listing(subreddit: str, origin: str, ep: str, limit: int,
+                  watermarks: Optional[Dict[str, Dict[str, Any]]] = None,
+                  limited: Optional[List[Tuple[str, RateLimited]]] = None,
+                  fetched: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Page through one listing and return only the children not seen on a previous run.
+
+    Paging follows the `after` cursor and stops at the first page that reaches a
+    fullname recorded in the watermark, or after FETCH_MAX_PAGES. With no
+    watermark yet (first run) a single page is fetched. The watermark entry for
+    this subreddit/endpoint is updated in place.
+
+    `hot` and `top` are ranked, not chronological, so page 1 nearly always
+    holds an already-seen post and later pages are rarely fetched; the
+    watermark mostly filters out posts that were returned before.
+
+    If Reddit rate-limits the listing, paging stops, (listing key, error) is
+    appended to `limited` (re-raised when it is None) and the watermark is left
+    as it was so the next fetch picks up the missed pages. The listing key is
+    appended to `fetched` once a real first page came back, new posts or not;
+    a page that failed (5xx, network, bad JSON) does not count.
+    """
+    key = f"{subreddit}/{origin}"
+    mark = (watermarks or {}).get(key)
+    seen = set(mark["seen"]) if mark else set()
+    max_pages = FETCH_MAX_PAGES if mark else 1
+
+    fresh, after = [], ""
+    for _ in range(max(max_pages, 1)):
+        try:
+            page = get_json(listing_url(subreddit, ep, limit, after))
+        except RateLimited as e:
+            if limited is None:
+                raise
+            limited.append((key, e))
+            return fresh
+        listing = page.get("data")
+        if not isinstance(listing, dict):
+            break  # get_json gave up on this page
+        if fetched is not None and not after:
+            fetched.append(key)
+        children = listing.get("children", [])
+        caught_up = False
+        for child in children:
+            name = child.get("data", {}).get("name", "")
+            if name in seen:
+                caught_up = True
+            else:
+                fresh.append(child)
+        after = listing.get("after") or ""
+        if caught_up or not after:
+            break
+
+    if watermarks is not None and fresh:
+        names = [c.get("data", {}).get("name", "") for c in fresh]
+        new_names = set(names)
+        old_seen = mark["seen"] if mark else []
+        watermarks[key] = {"seen": (names + [n for n in old_seen if n not in new_names])[:WATERMARK_SEEN_MAX]}
+    return fresh
+
+
+def merge_listing(results: Dict[str, Dict[str, Any]], children, subreddit: str, origin: str):
+    for post in children:
+        pdata = extract_post_data(post, subreddit, origin)
+        if pdata["id"]:
+            results[pdata["id"]] = pdata
+
+
+def fetch_subreddit_posts(subreddit: str, limit: int = DEFAULT_LIMIT,
+                          watermarks: Optional[Dict[str, Dict[str, Any]]] = None,
+                          limited: Optional[List[Tuple[str, RateLimited]]] = None,
+                          fetched: Optional[List[str]] = None):
     results = {}
     for origin, ep in ENDPOINTS:
-        url = f"https://www.reddit.com/r/{subreddit}/{ep.format(limit=limit)}"
-        data = get_json(url)
-        children = data.get("data", {}).get("children", [])
-        for post in children:
-            pdata = extract_post_data(post, subreddit, origin)
-            if pdata["id"]:
-                results[pdata["id"]] = pdata
+        children = fetch_listing(subreddit, origin, ep, limit, watermarks, limited, fetched)
+        merge_listing(results, children, subreddit, origin)
     return list(results.values())
 
-def fetch_popular_posts(subreddits: List[str], limit: int = DEFAULT_LIMIT): 
-    all_posts = [] 
-    for sub in subreddits: 
-        all_posts.extend(fetch_subreddit_posts(sub, limit)) 
-    return all_posts
+
+def fetch_popular_posts(subreddits: List[str], limit: int = DEFAULT_LIMIT, concurrency: int = FETCH_CONCURRENCY,
+                        incremental: bool = True):
+    """
+    Fetch every subreddit x endpoint listing, up to `concurrency` listings at a time.
+
+    Results are merged in the same order as the sequential walk, so the
+    per-subreddit id dedupe (later endpoints win) is unchanged. With
+    `incremental`, only posts newer than the saved watermarks are returned.
+
+    Returns (posts, watermarks, limited). The updated watermarks (None when not
+    incremental) are not saved here: the caller saves them with
+    save_watermarks() once the posts are stored, so a failed store does not
+    leave posts behind the watermark. `limited` lists the "subreddit/endpoint"
+    listings that were skipped because Reddit rate-limited them.
+
+    If no listing returned a page and at least one was rate limited,
+    RateLimited is raised instead of returning an empty list. Listings that
+    answered with no new posts count as fetched.
+    """
+    watermarks = load_watermarks() if incremental else None
+    limited: List[Tuple[str, RateLimited]] = []
+    fetched: List[str] = []
+
+    if concurrency <= 1:
+        all_posts = []
+        for sub in subreddits:
+            all_posts.extend(fetch_subreddit_posts(sub, limit, watermarks, limited, fetched))
+    else:
+        jobs = [(sub, origin, ep) for sub in subreddits for origin, ep in ENDPOINTS]
+        if not jobs:
+            return [], watermarks, []
+
+        # Each job only touches its own watermark key
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(jobs))) as pool:
+            pages = list(pool.map(lambda job: fetch_listing(*job, limit, watermarks, limited, fetched), jobs))
+
+        per_sub: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (sub, origin, _), children in zip(jobs, pages):
+            merge_listing(per_sub.setdefault(sub, {}), children, sub, origin)
+
+        all_posts = []
+        for results in per_sub.values():
+            all_posts.extend(results.values())
+
+    if limited and not fetched:
+        raise max((e for _, e in limited), key=lambda e: e.retry_after)
+    return all_posts, watermarks, sorted(key for key, _ in limited)
 
 def clean_comment_text(text: str, op_user: str):
     text = html.unescape(text or "")
@@ -102,11 +278,10 @@ def clean_comment_text(text: str, op_user: str):
 def fetch_top_comments(permalink: str, limit: int = 4):
     url = permalink + ".json?sort=top&limit=20"
     try:
-        r = requests.get(url, timeout=10, headers={"User-Agent": USER_AGENT})
-        if r.status_code != 200:
+        data = get_json(url, ttl=COMMENTS_CACHE_TTL)
+        if not data:
             return []
 
-        data = r.json()
         post_author = data[0]["data"]["children"][0]["data"].get("author", "")
 
         comments = data[1]["data"]["children"]
@@ -126,5 +301,7 @@ def fetch_top_comments(permalink: str, limit: int = 4):
         out.sort(key=lambda x: x["ups"], reverse=True)
         return out[:limit]
 
+    except RateLimited:
+        raise
     except:
         return []
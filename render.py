@@ -1,20 +1,58 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, NamedTuple, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
 from pathlib import Path
+from functools import lru_cache
 import io
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageDraw, ImageFont
-import requests
 import html
 
-def fetch_image(url: str):
+import image_cache
+
+def decode_image(data: bytes, max_height: int = None) -> Image.Image:
+    """
+    Decode image bytes for a slide that shows it at most `max_height` px tall.
+    JPEGs are decoded at a reduced DCT scale (draft mode), and anything still
+    more than 2x too tall is box-reduced before the final LANCZOS resize.
+    """
+    img = Image.open(io.BytesIO(data))
+    if max_height:
+        img.draft("RGB", (1, max_height))
+    img = img.convert("RGB")
+    if max_height and img.height >= 4 * max_height:
+        img = img.reduce(img.height // (2 * max_height))
+    return img
+
+
+def fetch_image(url: str, max_height: int = None):
     try:
-        res = requests.get(url, timeout=10, headers={"User-Agent": "FieldingSetBot"})
-        if res.status_code == 200:
-            return Image.open(io.BytesIO(res.content)).convert("RGB")
+        data = image_cache.fetch(url)
+        if data:
+            return decode_image(data, max_height)
     except Exception as e:
         print(f"Failed to fetch image: {e}")
     return None
 
 
+def fetch_post_image(post: Dict[str, Any], max_height: int = None):
+    """The post's image from its Reddit preview, falling back to the source image_url."""
+    preview_url = post.get("preview_url")
+    if preview_url:
+        img = fetch_image(preview_url, max_height)
+        if img is not None:
+            return img
+    image_url = post.get("image_url")
+    if image_url and image_url != preview_url:
+        return fetch_image(image_url, max_height)
+    return None
+
+
 # basic config
 CANVAS_SIZE = (1080, 1080)
 BACKGROUND_COLOR = (0, 0, 0)
@@ -33,67 +71,230 @@ MIN_IMAGE_HEIGHT = 280
 MAX_IMAGE_HEIGHT = 450
 
 
-def load_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
-    font_path = DEFAULT_BOLD_FONT if bold else DEFAULT_FONT
+# Estimated line widths this close to max_width are re-measured with textbbox,
+# so wrapping stays pixel-identical even if a font kerns across spaces.
+WRAP_GUARD_PX = 2
+# Wrapped layouts remembered per font, keyed by (text, max_width, spacing)
+LAYOUT_CACHE_SIZE = 512
+# Solved body font sizes, keyed by (text hash, strategy, canvas)
+FIT_CACHE_SIZE = 1024
+# Processes used by render_slides; 1 renders in-process
+RENDER_WORKERS = int(os.environ.get("FS_RENDER_WORKERS", str(os.cpu_count() or 1)))
+
+
+@lru_cache(maxsize=None)
+def _cached_font(font_path: str, size: int, bold: bool) -> ImageFont.FreeTypeFont:
     try:
         return ImageFont.truetype(font_path, size=size)
     except OSError:
         return ImageFont.load_default()
 
 
+def load_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
+    """Process-wide font cache keyed by (path, size, bold)."""
+    font_path = DEFAULT_BOLD_FONT if bold else DEFAULT_FONT
+    return _cached_font(font_path, size, bold)
+
+
+class TextLayout(NamedTuple):
+    lines: List[str]
+    height: int
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+class FontMetrics:
+    """Memoized word advances, ink extents and wrapped layouts for one font."""
+
+    def __init__(self, font: ImageFont.FreeTypeFont):
+        self.font = font
+        self.space = round(font.getlength(" ") * 64)
+        self._words: Dict[str, Tuple[int, int, int]] = {}
+        self._line_spacing: Dict[float, float] = {}
+        self._layouts: "OrderedDict[Tuple[str, int, float], TextLayout]" = OrderedDict()
+
+    def word(self, w: str) -> Tuple[int, int, int]:
+        """(advance in 1/64 px, ink left, ink right) of a single word."""
+        m = self._words.get(w)
+        if m is None:
+            bbox = self.font.getbbox(w)
+            m = (round(self.font.getlength(w) * 64), bbox[0], bbox[2])
+            self._words[w] = m
+        return m
+
+    def line_spacing(self, spacing: float, draw: ImageDraw.ImageDraw) -> float:
+        """Distance between baselines in multiline text, as Pillow lays it out."""
+        ls = self._line_spacing.get(spacing)
+        if ls is None:
+            one = draw.textbbox((0, 0), "A", font=self.font)
+            two = draw.multiline_textbbox((0, 0), "A\nA", font=self.font, spacing=spacing)
+            ls = two[3] - one[3]
+            self._line_spacing[spacing] = ls
+        return ls
+
+    def cached_layout(self, key) -> TextLayout:
+        layout = self._layouts.get(key)
+        if layout is not None:
+            self._layouts.move_to_end(key)
+        return layout
+
+    def store_layout(self, key, layout: TextLayout):
+        self._layouts[key] = layout
+        if len(self._layouts) > LAYOUT_CACHE_SIZE:
+            self._layouts.popitem(last=False)
+
+
+_metrics = weakref.WeakKeyDictionary()
+
+
+def font_metrics(font: ImageFont.FreeTypeFont) -> FontMetrics:
+    m = _metrics.get(font)
+    if m is None:
+        m = FontMetrics(font)
+        _metrics[font] = m
+    return m
+
+
 def clean_text(s: str) -> str:
     return html.unescape(s or "").strip()
 
 
-def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int, draw: ImageDraw.ImageDraw) -> str:
-    words = (text or "").split()
+def _break_lines(text: str, metrics: FontMetrics, max_width: int, draw: ImageDraw.ImageDraw) -> List[str]:
+    """Greedy word wrap using memoized word widths; each word is measured once per font."""
+    font = metrics.font
+    limit = max_width * 64
+    guard = WRAP_GUARD_PX * 64
     lines = []
-    current = ""
+    current: List[str] = []
+    first_left = 0      # ink left of the first word on the line (px)
+    advance = 0         # pen advance of the current line in 1/64 px, no trailing space
 
-    for w in words:
-        test = (current + " " + w).strip()
-        bbox = draw.textbbox((0, 0), test, font=font)
-        w_width = bbox[2] - bbox[0]
+    for w in (text or "").split():
+        w_adv, w_left, w_right = metrics.word(w)
 
-        if w_width <= max_width:
-            current = test
+        # Line ink width = pen position of the last word + its ink right - first word's ink left
+        if current:
+            width = advance + metrics.space + (w_right - first_left) * 64
         else:
+            width = (w_right - w_left) * 64
+        if abs(width - limit) <= guard:
+            bbox = draw.textbbox((0, 0), " ".join(current + [w]), font=font)
+            width = (bbox[2] - bbox[0]) * 64
+
+        if width <= limit:
             if current:
-                lines.append(current)
-            current = w
+                advance += metrics.space + w_adv
+            else:
+                first_left, advance = w_left, w_adv
+            current.append(w)
+        else:
+            if current:
+                lines.append(" ".join(current))
+            current = [w]
+            first_left, advance = w_left, w_adv
 
     if current:
-        lines.append(current)
+        lines.append(" ".join(current))
+    return lines
+
+
+def layout_text(text: str, font: ImageFont.FreeTypeFont, max_width: int, draw: ImageDraw.ImageDraw, spacing: float = 4) -> TextLayout:
+    """
+    Wrap `text` to `max_width` and measure its multiline height in one pass.
+    Matches draw.multiline_textbbox(..., spacing=spacing) on the wrapped text;
+    results are memoized per font so the fit search never wraps twice.
+    """
+    metrics = font_metrics(font)
+    key = (text, max_width, spacing)
+    layout = metrics.cached_layout(key)
+    if layout is not None:
+        return layout
+
+    lines = _break_lines(text, metrics, max_width, draw)
+    if lines:
+        ls = metrics.line_spacing(spacing, draw)
+        top = bottom = None
+        for i, line in enumerate(lines):
+            bbox = draw.textbbox((0, i * ls), line, font=font)
+            top = bbox[1] if top is None else min(top, bbox[1])
+            bottom = bbox[3] if bottom is None else max(bottom, bbox[3])
+        height = bottom - top
+    else:
+        bbox = draw.multiline_textbbox((0, 0), "", font=font, spacing=spacing)
+        height = bbox[3] - bbox[1]
 
-    return "\n".join(lines)
+    layout = TextLayout(lines, height)
+    metrics.store_layout(key, layout)
+    return layout
+
+
+def wrap_text(text: str, font: ImageFont.FreeTypeFont, max_width: int, draw: ImageDraw.ImageDraw) -> str:
+    return layout_text(text, font, max_width, draw).text
 
 
 def calculate_text_height(text: str, font: ImageFont.FreeTypeFont, max_width: int, draw: ImageDraw.ImageDraw) -> int:
     """Calculate how much vertical space text will take"""
     if not text:
         return 0
-    wrapped = wrap_text(text, font, max_width, draw)
-    bbox = draw.multiline_textbbox((0, 0), wrapped, font=font, spacing=8)
-    return bbox[3] - bbox[1]
+    return layout_text(text, font, max_width, draw, spacing=8).height
+
 
+@dataclass(frozen=True)
+class Watermark:
+    """A watermark asset and where it sits on the canvas."""
+    path: str = LOGO_PATH
+    width_ratio: float = 0.10     # logo width as a fraction of canvas width
+    padding_ratio: float = 0.03   # gap to the canvas edges, fraction of canvas width
+    position: str = "bottom-right"
 
-def add_logo(image: Image.Image) -> Image.Image:
-    logo_file = Path(LOGO_PATH)
+
+DEFAULT_WATERMARK = Watermark()
+WATERMARK_POSITIONS = ("top-left", "top-right", "bottom-left", "bottom-right", "center")
+
+
+@lru_cache(maxsize=32)
+def _prepared_watermark(wm: Watermark, canvas_size: Tuple[int, int]):
+    """
+    Resized RGB logo, its alpha mask and paste position for one canvas size,
+    or None if the asset is missing. Computed once per (watermark, canvas size).
+    """
+    if wm.position not in WATERMARK_POSITIONS:
+        raise ValueError(f"Unknown watermark position {wm.position!r}")
+    logo_file = Path(wm.path)
     if not logo_file.exists():
-        return image
+        return None
 
+    canvas_w, canvas_h = canvas_size
     logo = Image.open(logo_file).convert("RGBA")
-    target_width = int(image.width * 0.10)
+    target_width = int(canvas_w * wm.width_ratio)
     ratio = target_width / logo.width
     logo = logo.resize((target_width, int(logo.height * ratio)), Image.LANCZOS)
 
-    padding = int(image.width * 0.03)
-    x = image.width - logo.width - padding
-    y = image.height - logo.height - padding
+    padding = int(canvas_w * wm.padding_ratio)
+    left, right = padding, canvas_w - logo.width - padding
+    top, bottom = padding, canvas_h - logo.height - padding
+    x, y = {
+        "top-left": (left, top),
+        "top-right": (right, top),
+        "bottom-left": (left, bottom),
+        "bottom-right": (right, bottom),
+        "center": ((canvas_w - logo.width) // 2, (canvas_h - logo.height) // 2),
+    }[wm.position]
 
-    image = image.convert("RGBA")
-    image.alpha_composite(logo, dest=(x, y))
-    return image.convert("RGB")
+    return logo.convert("RGB"), logo.getchannel("A"), (x, y)
+
+
+def add_logo(image: Image.Image, watermark: Watermark = DEFAULT_WATERMARK) -> Image.Image:
+    """Paste the watermark onto an RGB canvas in place, using its alpha as the mask."""
+    prepared = _prepared_watermark(watermark, image.size)
+    if prepared is None:
+        return image
+
+    logo, mask, dest = prepared
+    image.paste(logo, dest, mask)
+    return image
 
 
 def smart_truncate_text(text: str, max_chars: int) -> str:
@@ -119,11 +320,119 @@ def smart_truncate_text(text: str, max_chars: int) -> str:
         return truncated + "…"
 
 
+@dataclass(frozen=True)
+class BodyLayout:
+    """Chosen body text + image split for a slide."""
+    text: str
+    truncated: bool
+    body_font: int
+    image_height: int
+    image_ratio: float
+
+
+def body_strategies(text_len: int) -> List[Tuple[float, int, int]]:
+    """Candidate (image_ratio, max_text_chars, starting_body_font), most image-heavy first."""
+    strategies = []
+
+    # Extremely short text => HUGE image priority
+    if text_len < 200:
+        strategies.extend([
+            (0.72, 400, MAX_BODY_FONT),   # Big image, still readable text
+            (0.65, 300, MAX_BODY_FONT),
+            (0.58, 250, MAX_BODY_FONT),
+        ])
+
+    # Regular short text
+    if text_len < 500:
+        strategies.extend([
+            (0.50, 450, MAX_BODY_FONT),
+            (0.45, 500, MAX_BODY_FONT - 4),
+        ])
+
+    # Longer text
+    strategies.extend([
+        (0.42, 800, MAX_BODY_FONT),
+        (0.38, 700, MAX_BODY_FONT - 4),
+        (0.35, 600, MAX_BODY_FONT),
+        (0.32, 500, MAX_BODY_FONT),
+        (0.30, 400, MAX_BODY_FONT),
+    ])
+    return strategies
+
+
+_fit_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+
+
+def fit_body_font(text: str, starting_font: int, max_width: int, body_space: int, draw: ImageDraw.ImageDraw):
+    """
+    Largest font size in starting_font, starting_font - 2, ... MIN_BODY_FONT whose
+    wrapped height fits body_space, or None. Text height grows with font size,
+    so this binary-searches the size list instead of sweeping it.
+    """
+    key = (hashlib.sha1(text.encode("utf-8")).hexdigest(), starting_font, max_width, body_space)
+    if key in _fit_cache:
+        _fit_cache.move_to_end(key)
+        return _fit_cache[key]
+
+    sizes = list(range(starting_font, MIN_BODY_FONT - 1, -2))
+    lo, hi = 0, len(sizes)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if calculate_text_height(text, load_font(sizes[mid]), max_width, draw) <= body_space:
+            hi = mid
+        else:
+            lo = mid + 1
+    size = sizes[lo] if lo < len(sizes) else None
+
+    _fit_cache[key] = size
+    if len(_fit_cache) > FIT_CACHE_SIZE:
+        _fit_cache.popitem(last=False)
+    return size
+
+
+def solve_body_layout(text: str, has_image: bool, remaining_height: int, max_width: int, draw: ImageDraw.ImageDraw) -> BodyLayout:
+    """Pick the first strategy (by image priority) whose text fits, with its largest font."""
+    for img_ratio, max_chars, starting_font in body_strategies(len(text)):
+        # Truncate text for this strategy
+        test_text = smart_truncate_text(text, max_chars)
+
+        # Calculate image height
+        if has_image:
+            test_img_height = int(remaining_height * img_ratio)
+            test_img_height = max(MIN_IMAGE_HEIGHT, min(MAX_IMAGE_HEIGHT, test_img_height))
+            spacing_after_img = 25
+        else:
+            test_img_height = 0
+            spacing_after_img = 0
+
+        # Calculate available space for body
+        body_space = remaining_height - test_img_height - spacing_after_img
+
+        font_size = fit_body_font(test_text, starting_font, max_width, body_space, draw)
+        if font_size is not None:
+            return BodyLayout(
+                text=test_text,
+                truncated=len(test_text) < len(text),
+                body_font=font_size,
+                image_height=test_img_height,
+                image_ratio=img_ratio,
+            )
+
+    # Fallback if nothing fits (shouldn't happen with our strategies)
+    return BodyLayout(
+        text=smart_truncate_text(text, 300),
+        truncated=True,
+        body_font=MIN_BODY_FONT,
+        image_height=MIN_IMAGE_HEIGHT if has_image else 0,
+        image_ratio=0.25,
+    )
+
+
 def render_post_image(post: Dict[str, Any], output_path: str) -> str:
     title = clean_text(post.get("title", ""))
     text = clean_text(post.get("text", ""))
     subreddit = clean_text(post.get("subreddit", ""))
-    image_url = post.get("image_url", "")
+    image_url = post.get("preview_url") or post.get("image_url", "")
 
     # Base canvas
     img = Image.new("RGB", CANVAS_SIZE, BACKGROUND_COLOR)
@@ -135,7 +444,7 @@ def render_post_image(post: Dict[str, Any], output_path: str) -> str:
     
     # 🔹 If no text and image exists → full image layout
     if image_url and not text:
-        reddit_img = fetch_image(image_url)
+        reddit_img = fetch_post_image(post, max_height=CANVAS_SIZE[1])
         if reddit_img:
             # Fit full space below title + subreddit + logo padding
             sub_height = 0
@@ -150,9 +459,9 @@ def render_post_image(post: Dict[str, Any], output_path: str) -> str:
             # Auto-size title only
             title_font_size = 45
             title_font = load_font(title_font_size, True)
-            wrapped_title = wrap_text(title, title_font, max_width, draw)
-            bbox_title = draw.multiline_textbbox((margin, y), wrapped_title, font=title_font)
-            title_height = bbox_title[3] - bbox_title[1]
+            title_layout = layout_text(title, title_font, max_width, draw)
+            wrapped_title = title_layout.text
+            title_height = title_layout.height
             draw.multiline_text((margin, y), wrapped_title, font=title_font, fill=TITLE_COLOR)
             y += title_height + 20
 
@@ -194,9 +503,9 @@ def render_post_image(post: Dict[str, Any], output_path: str) -> str:
     
     max_title_height = CANVAS_SIZE[1] * 0.25
     while title_font_size > 32:
-        wrapped_title = wrap_text(title, title_font, max_width, draw)
-        bbox = draw.multiline_textbbox((margin, y), wrapped_title, font=title_font)
-        title_height = bbox[3] - bbox[1]
+        title_layout = layout_text(title, title_font, max_width, draw)
+        wrapped_title = title_layout.text
+        title_height = title_layout.height
         if title_height <= max_title_height:
             break
         title_font_size -= 2
@@ -211,91 +520,15 @@ def render_post_image(post: Dict[str, Any], output_path: str) -> str:
     # 4️⃣ Fetch image if available
     reddit_img = None
     if image_url:
-        reddit_img = fetch_image(image_url)
+        reddit_img = fetch_post_image(post, max_height=MAX_IMAGE_HEIGHT)
 
     # 5️⃣ SMART BALANCING: Try different combinations to find best fit
-    best_config = None
-    text_original = text
-    
-    # Define strategies: (image_ratio, max_text_chars, min_body_font)
-    text_len = len(text)
-
-    strategies = []
-
-    # Extremely short text => HUGE image priority
-    if text_len < 200:
-        strategies.extend([
-            (0.72, 400, MAX_BODY_FONT),   # Big image, still readable text
-            (0.65, 300, MAX_BODY_FONT),
-            (0.58, 250, MAX_BODY_FONT),
-        ])
-
-    # Regular short text
-    if text_len < 500:
-        strategies.extend([
-            (0.50, 450, MAX_BODY_FONT),
-            (0.45, 500, MAX_BODY_FONT - 4),
-        ])
-
-    # Longer text
-    strategies.extend([
-        (0.42, 800, MAX_BODY_FONT),
-        (0.38, 700, MAX_BODY_FONT - 4),
-        (0.35, 600, MAX_BODY_FONT),
-        (0.32, 500, MAX_BODY_FONT),
-        (0.30, 400, MAX_BODY_FONT),
-    ])
-
-   
-    for img_ratio, max_chars, starting_font in strategies:
-        # Truncate text for this strategy
-        test_text = smart_truncate_text(text_original, max_chars)
-        
-        # Calculate image height
-        if reddit_img:
-            test_img_height = int(remaining_height * img_ratio)
-            test_img_height = max(MIN_IMAGE_HEIGHT, min(MAX_IMAGE_HEIGHT, test_img_height))
-            spacing_after_img = 25
-        else:
-            test_img_height = 0
-            spacing_after_img = 0
-        
-        # Calculate available space for body
-        body_space = remaining_height - test_img_height - spacing_after_img
-        
-        # Try to fit text with this font size
-        for font_size in range(starting_font, MIN_BODY_FONT - 1, -2):
-            test_font = load_font(font_size)
-            test_height = calculate_text_height(test_text, test_font, max_width, draw)
-            
-            if test_height <= body_space:
-                # Found a fit! Save this configuration
-                best_config = {
-                    'text': test_text,
-                    'truncated': len(test_text) < len(text_original),
-                    'body_font': font_size,
-                    'image_height': test_img_height,
-                    'image_ratio': img_ratio
-                }
-                break
-        
-        if best_config:
-            break
-    
-    # Fallback if nothing fits (shouldn't happen with our strategies)
-    if not best_config:
-        best_config = {
-            'text': smart_truncate_text(text_original, 300),
-            'truncated': True,
-            'body_font': MIN_BODY_FONT,
-            'image_height': MIN_IMAGE_HEIGHT if reddit_img else 0,
-            'image_ratio': 0.25
-        }
+    best_config = solve_body_layout(text, reddit_img is not None, remaining_height, max_width, draw)
 
     # 6️⃣ Render the image with best configuration
     image_height = 0
-    if reddit_img and best_config['image_height'] > 0:
-        image_height = best_config['image_height']
+    if reddit_img and best_config.image_height > 0:
+        image_height = best_config.image_height
         w, h = reddit_img.size
         scale = image_height / h
         new_size = (int(w * scale), int(h * scale))
@@ -306,8 +539,8 @@ def render_post_image(post: Dict[str, Any], output_path: str) -> str:
         y += image_height + 25
 
     # 7️⃣ Render body text
-    body_font = load_font(best_config['body_font'])
-    wrapped_body = wrap_text(best_config['text'], body_font, max_width, draw)
+    body_font = load_font(best_config.body_font)
+    wrapped_body = layout_text(best_config.text, body_font, max_width, draw, spacing=8).text
     draw.multiline_text((margin, y), wrapped_body, font=body_font, fill=TEXT_COLOR, spacing=8)
 
     # 8️⃣ Logo watermark
@@ -318,15 +551,77 @@ def render_post_image(post: Dict[str, Any], output_path: str) -> str:
     
     print(f"✅ Image saved: {output_path}")
     print(f"   Title font: {title_font_size}px")
-    print(f"   Body font: {best_config['body_font']}px")
+    print(f"   Body font: {best_config.body_font}px")
     if reddit_img:
-        print(f"   Image height: {image_height}px ({int(best_config['image_ratio']*100)}% of space)")
-    if best_config['truncated']:
-        print(f"   ⚠️  Text truncated to {len(best_config['text'])} chars")
+        print(f"   Image height: {image_height}px ({int(best_config.image_ratio*100)}% of space)")
+    if best_config.truncated:
+        print(f"   ⚠️  Text truncated to {len(best_config.text)} chars")
     
     return output_path
 
 
+_render_pool = None
+_render_pool_workers = 0
+# Guards creating/replacing the pool and submitting to it (stage threads, daemon refresh)
+_render_pool_lock = threading.Lock()
+
+
+def _init_render_worker():
+    """Load fonts and the watermark once per worker process."""
+    load_font(38, True)
+    for size in range(45, 31, -2):
+        load_font(size, True)
+    for size in range(MAX_BODY_FONT, MIN_BODY_FONT - 1, -2):
+        load_font(size)
+    _prepared_watermark(DEFAULT_WATERMARK, CANVAS_SIZE)
+
+
+def _render_job(job: Tuple[Dict[str, Any], str]) -> str:
+    post, output_path = job
+    return render_post_image(post, output_path)
+
+
+def _get_render_pool(workers: int) -> ProcessPoolExecutor:
+    """Call with _render_pool_lock held."""
+    global _render_pool, _render_pool_workers
+    if _render_pool is None or _render_pool_workers < workers:
+        if _render_pool is not None:
+            # Work already submitted by other threads still finishes
+            _render_pool.shutdown(wait=False)
+        # Spawned, not forked: workers start after the uploader/refresh threads are
+        # running, and a fork could copy a lock (HTTP session, logging) another thread holds
+        _render_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_render_worker,
+        )
+        _render_pool_workers = workers
+    return _render_pool
+
+
+def warm_up():
+    """Load fonts and the watermark now and start the render pool (for the long-running daemon)."""
+    _init_render_worker()
+    if RENDER_WORKERS > 1:
+        with _render_pool_lock:
+            _get_render_pool(RENDER_WORKERS)
+
+
+def render_slides(jobs: List[Tuple[Dict[str, Any], str]], workers: int = None) -> List[str]:
+    """
+    Render (post, output_path) jobs across a process pool.
+    Returns output paths in the same order as `jobs`.
+    """
+    workers = RENDER_WORKERS if workers is None else workers
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        return [_render_job(job) for job in jobs]
+    with _render_pool_lock:
+        pool = _get_render_pool(workers)
+        futures = [pool.submit(_render_job, job) for job in jobs]
+    return [f.result() for f in futures]
+
+
 if __name__ == "__main__":
     # Test with short text
     short_post = {
@@ -0,0 +1,52 @@
+"""
+Disk-backed HTTP cache for Reddit JSON responses (listings and comment threads).
+Bodies are stored with their ETag/Last-Modified; entries younger than the
+caller's TTL are served without touching the network, older ones are
+revalidated with a conditional GET and a 304 is answered from disk.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from disk_cache import DiskCache
+
+RESPONSE_CACHE_DIR = Path(os.environ.get("FS_RESPONSE_CACHE_DIR", ".cache/http"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("FS_RESPONSE_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+_cache = DiskCache(RESPONSE_CACHE_DIR, ".body", RESPONSE_CACHE_MAX_BYTES)
+
+
+def evict(max_bytes: int = None):
+    """Drop least-recently-used entries until the cache fits in max_bytes."""
+    _cache.evict(max_bytes)
+
+
+def _decode(body: Optional[bytes]) -> Any:
+    if body is None:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _valid_json(body: bytes) -> Optional[bytes]:
+    """Only cache bodies that parse."""
+    return body if _decode(body) is not None else None
+
+
+def fetch_json(url: str, ttl: float, headers: Optional[dict] = None) -> Tuple[int, Any]:
+    """
+    Return (status, parsed JSON) for `url`, from disk when possible.
+
+    Entries fetched less than `ttl` seconds ago are returned as (200, data)
+    without a request; older ones are revalidated, and a 304 is answered from
+    disk as (200, data). Any other status comes back as (status, None). On a
+    network error a stale entry is served, otherwise the error propagates.
+    """
+    status, body = _cache.fetch(url, ttl, headers, prepare=_valid_json)
+    if status != 200:
+        return status, None
+    return 200, _decode(body)
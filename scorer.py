@@ -1,6 +1,6 @@
 import math
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence
 
 from logger_config import setup_logger
 
@@ -13,19 +13,24 @@ SUBREDDIT_WEIGHT = {
 } #provide weights
 
 
+# Engagement normalisers, shared by the scalar and batch paths
+VOTES_NORM = math.log10(1000 + 10)
+COMMENTS_NORM = math.log10(100 + 1)
+
+
 def normalize_engagement(votes: int, comments: int) -> float:
     v = max(votes, 0)
     c = max(comments, 0)
     # log-scale
-    nv = math.log10(v + 10) / math.log10(1000 + 10)  # ~0..1 for 0-1000+
-    nc = math.log10(c + 1) / math.log10(100 + 1)     # ~0..1 for 0-100+
+    nv = math.log10(v + 10) / VOTES_NORM  # ~0..1 for 0-1000+
+    nc = math.log10(c + 1) / COMMENTS_NORM     # ~0..1 for 0-100+
     return 0.7 * nv + 0.3 * nc
 
 
-def recency_score(timestamp_utc: float) -> float:
+def recency_score(timestamp_utc: float, now: Optional[float] = None) -> float:
     if not timestamp_utc:
         return 0.5
-    now = time.time()
+    now = time.time() if now is None else now
     age_hours = (now - timestamp_utc) / 3600
 
     if age_hours <= 24:
@@ -38,8 +43,30 @@ def recency_score(timestamp_utc: float) -> float:
         return 0.2
 
 
+# Ages (hours) where recency_score changes bucket
+RECENCY_BOUNDARIES_HOURS = (24, 48, 72)
+
+
+def next_rescore_at(timestamp_utc: float, now: Optional[float] = None) -> float:
+    """
+    Epoch time after which recency_score(timestamp_utc) moves to its next bucket,
+    or inf once it has reached the last one (or the timestamp is missing).
+    """
+    if not timestamp_utc:
+        return math.inf
+    now = time.time() if now is None else now
+    age_hours = (now - timestamp_utc) / 3600
+    for hours in RECENCY_BOUNDARIES_HOURS:
+        if age_hours <= hours:
+            return timestamp_utc + hours * 3600
+    return math.inf
+
+
 def length_score(text: str) -> float:
-    n = len(text or "")
+    return length_bucket(len(text or ""))
+
+
+def length_bucket(n: int) -> float:
     if n < 80:
         return 0.4
     elif n <= 600:
@@ -54,7 +81,16 @@ def subreddit_weight(subreddit: str) -> float:
     return SUBREDDIT_WEIGHT.get(subreddit, 0.5)
 
 
-def compute_final_score(post: Dict[str, Any]) -> float:
+def _combine(eng: float, rec: float, ln: float, sw: float) -> float:
+    return (
+        0.4 * eng +
+        0.25 * rec +
+        0.2 * ln +
+        0.15 * sw
+    )
+
+
+def compute_final_score(post: Dict[str, Any], now: Optional[float] = None) -> float:
     stats = post.get("stats", {})
     votes = int(stats.get("votes", post.get("score", 0)) or 0)
     comments = int(stats.get("comments", 0) or 0)
@@ -63,17 +99,85 @@ def compute_final_score(post: Dict[str, Any]) -> float:
     sub = post.get("subreddit", "")
 
     eng = normalize_engagement(votes, comments)
-    rec = recency_score(float(ts))
+    rec = recency_score(float(ts), now)
     ln = length_score(text)
     sw = subreddit_weight(sub)
 
-    final_score = (
-        0.4 * eng +
-        0.25 * rec +
-        0.2 * ln +
-        0.15 * sw
-    )
+    final_score = _combine(eng, rec, ln, sw)
     final_score = round(final_score, 4)
     
-    logger.debug(f"Scored post (sub={sub}): engagement={eng:.3f}, recency={rec:.3f}, length={ln:.3f}, weight={sw:.3f} -> final={final_score}")
+    logger.debug(
+        "Scored post (sub=%s): engagement=%.3f, recency=%.3f, length=%.3f, weight=%.3f -> final=%s",
+        sub, eng, rec, ln, sw, final_score,
+    )
     return final_score
+
+
+def score_batch(
+    votes: Sequence[int],
+    comments: Sequence[int],
+    timestamps: Sequence[float],
+    text_lengths: Sequence[int],
+    subreddits: Sequence[str],
+    now: Optional[float] = None,
+):
+    """
+    Vectorized compute_final_score over columns, with one shared `now`.
+    Returns a float NumPy array equal to compute_final_score for each row.
+    Missing timestamps may be passed as 0 or NaN. Requires numpy.
+    """
+    import numpy as np
+
+    now = time.time() if now is None else now
+    v = np.maximum(np.asarray(votes, dtype=np.int64), 0).astype(np.float64)
+    c = np.maximum(np.asarray(comments, dtype=np.int64), 0).astype(np.float64)
+    ts = np.nan_to_num(np.asarray(timestamps, dtype=np.float64), nan=0.0)
+    n = np.asarray(text_lengths, dtype=np.int64)
+
+    eng = 0.7 * (np.log10(v + 10) / VOTES_NORM) + 0.3 * (np.log10(c + 1) / COMMENTS_NORM)
+
+    age_hours = (now - ts) / 3600
+    rec = np.select(
+        [ts == 0, age_hours <= 24, age_hours <= 48, age_hours <= 72],
+        [0.5, 1.0, 0.7, 0.4],
+        default=0.2,
+    )
+    ln = np.select([n < 80, n <= 600, n <= 1200], [0.4, 1.0, 0.7], default=0.3)
+    sw = np.fromiter((subreddit_weight(s) for s in subreddits), dtype=np.float64, count=len(v))
+
+    raw = _combine(eng, rec, ln, sw)
+    scores = np.round(raw, 4)
+
+    # np.round and np.log10 can differ from round()/math.log10 in the last bit;
+    # rows sitting on a rounding boundary are recomputed with the scalar path.
+    frac = raw * 10000 - np.floor(raw * 10000)
+    for i in np.flatnonzero(np.abs(frac - 0.5) < 1e-6):
+        scores[i] = round(_combine(
+            normalize_engagement(int(votes[i]), int(comments[i])),
+            recency_score(float(ts[i]), now),
+            length_bucket(int(n[i])),
+            float(sw[i]),
+        ), 4)
+    return scores
+
+
+def score_posts(posts: List[Dict[str, Any]], now: Optional[float] = None):
+    """
+    score_batch over post/row dicts shaped like compute_final_score's input.
+    Without numpy installed, falls back to compute_final_score per post.
+    """
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        now = time.time() if now is None else now
+        return [compute_final_score(post, now) for post in posts]
+
+    votes, comments, timestamps, lengths, subs = [], [], [], [], []
+    for post in posts:
+        stats = post.get("stats", {})
+        votes.append(int(stats.get("votes", post.get("score", 0)) or 0))
+        comments.append(int(stats.get("comments", 0) or 0))
+        timestamps.append(float(post.get("timestamp_utc") or 0))
+        lengths.append(len(post.get("text", "") or ""))
+        subs.append(post.get("subreddit", ""))
+    return score_batch(votes, comments, timestamps, lengths, subs, now)
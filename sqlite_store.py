@@ -0,0 +1,216 @@
+"""
+SQLite backing store with the same API as csv_store.
+State changes are single-row UPDATEs instead of full-file rewrites, and
+candidate queries are served from an index on (posted, discarded, final_score).
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+import csv_store
+from csv_store import FIELDS, post_to_row, safe_float
+
+DB_FILE = os.environ.get("FS_SQLITE_FILE", "reddit_posts.db")
+
+# Columns stored with a native type; everything else is TEXT like the CSV.
+BOOL_FIELDS = {"posted", "discarded"}
+REAL_FIELDS = {"final_score", "rescore_at"}
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.RLock()
+
+
+def _column_type(field: str) -> str:
+    if field == "id":
+        return "TEXT PRIMARY KEY"
+    if field in BOOL_FIELDS:
+        return "INTEGER NOT NULL DEFAULT 0"
+    if field in REAL_FIELDS:
+        return "REAL NOT NULL DEFAULT 0"
+    return "TEXT"
+
+
+def _to_db(field: str, value):
+    if field in BOOL_FIELDS:
+        return 1 if str(value).lower() == "true" else 0
+    if field in REAL_FIELDS:
+        return safe_float(value)
+    return "" if value is None else str(value)
+
+
+def _from_db(field: str, value):
+    if field in BOOL_FIELDS:
+        return "True" if value else "False"
+    if field in REAL_FIELDS:
+        return str(value)
+    return "" if value is None else value
+
+
+def _row_to_dict(row) -> Dict[str, Any]:
+    return {f: _from_db(f, row[f]) for f in FIELDS}
+
+
+def _ensure_schema(conn: sqlite3.Connection):
+    cols = ", ".join(f"{f} {_column_type(f)}" for f in FIELDS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS posts ({cols})")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    # Add columns introduced after the database was created
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(posts)")}
+    for f in FIELDS:
+        if f not in existing:
+            conn.execute(f"ALTER TABLE posts ADD COLUMN {f} {_column_type(f)}")
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_posts_candidates "
+        "ON posts (posted, discarded, final_score)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_posts_rescore "
+        "ON posts (posted, discarded, rescore_at)"
+    )
+    conn.commit()
+
+
+def get_connection() -> sqlite3.Connection:
+    global _conn
+    with _lock:
+        if _conn is None:
+            conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            _ensure_schema(conn)
+            _conn = conn
+            migrate_from_csv()
+        return _conn
+
+
+def _insert_rows(conn: sqlite3.Connection, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    placeholders = ", ".join("?" for _ in FIELDS)
+    sql = f"INSERT OR IGNORE INTO posts ({', '.join(FIELDS)}) VALUES ({placeholders})"
+    new = []
+    for r in rows:
+        cur = conn.execute(sql, [_to_db(f, r.get(f, "")) for f in FIELDS])
+        if cur.rowcount:
+            new.append(r)
+    return new
+
+
+def migrate_from_csv(csv_path: Optional[str] = None) -> int:
+    """
+    One-shot import of the existing CSV history.
+    Runs once per database; the CSV file itself is left untouched.
+    """
+    csv_path = csv_path or csv_store.CSV_FILE
+    with _lock:
+        conn = get_connection()
+        done = conn.execute("SELECT value FROM meta WHERE key = 'migrated_from_csv'").fetchone()
+        if done or not os.path.exists(csv_path):
+            return 0
+
+        with open(csv_path, "r", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+
+        with conn:
+            new = _insert_rows(conn, rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from_csv', ?)",
+                (csv_path,),
+            )
+        return len(new)
+
+
+def add_posts(posts: List[Dict[str, Any]]):
+    with _lock:
+        conn = get_connection()
+        with conn:
+            return _insert_rows(conn, [post_to_row(p) for p in posts])
+
+
+def _set_flag(post_id: str, field: str) -> bool:
+    with _lock:
+        conn = get_connection()
+        with conn:
+            cur = conn.execute(f"UPDATE posts SET {field} = 1 WHERE id = ?", (post_id,))
+        return cur.rowcount > 0
+
+
+def mark_posted(pid, media_pk: str = ""):
+    """Set posted=True, and record the Instagram media pk when given."""
+    if not media_pk:
+        return _set_flag(pid, "posted")
+    with _lock:
+        conn = get_connection()
+        with conn:
+            cur = conn.execute("UPDATE posts SET posted = 1, media_pk = ? WHERE id = ?", (str(media_pk), pid))
+        return cur.rowcount > 0
+
+
+def mark_discarded(post_id: str) -> bool:
+    return _set_flag(post_id, "discarded")
+
+
+def record_verdicts(verdicts: Dict[str, bool]) -> int:
+    """
+    Store LLM postworthy verdicts in one transaction. Posts judged not
+    postworthy are also discarded. Returns how many rows were updated.
+    """
+    updated = 0
+    with _lock:
+        conn = get_connection()
+        with conn:
+            for pid, ok in verdicts.items():
+                cur = conn.execute(
+                    "UPDATE posts SET postworthy = ?, discarded = CASE WHEN ? THEN discarded ELSE 1 END WHERE id = ?",
+                    (str(bool(ok)), bool(ok), pid),
+                )
+                updated += cur.rowcount
+    return updated
+
+
+def get_unposted(limit: Optional[int] = None, min_score: float = 0.0, screened: Optional[bool] = None):
+    sql = "SELECT * FROM posts WHERE posted = 0 AND discarded = 0 AND final_score >= ?"
+    if screened is True:
+        sql += " AND postworthy = 'True'"
+    elif screened is False:
+        sql += " AND COALESCE(postworthy, '') = ''"
+    sql += " ORDER BY final_score DESC"
+    params: list = [min_score]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    with _lock:
+        rows = get_connection().execute(sql, params).fetchall()
+    return [_row_to_dict(r) for r in rows]
+
+
+def get_due_rescore(now: float, limit: Optional[int] = None):
+    """Candidate rows whose recency bucket changed before `now`, oldest first."""
+    sql = "SELECT * FROM posts WHERE posted = 0 AND discarded = 0 AND rescore_at < ? ORDER BY rescore_at"
+    params: list = [now]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with _lock:
+        rows = get_connection().execute(sql, params).fetchall()
+    return [_row_to_dict(r) for r in rows]
+
+
+def update_scores(updates: Dict[str, Tuple[float, float]]) -> int:
+    """Set {id: (final_score, rescore_at)} in one transaction. Returns how many rows were updated."""
+    updated = 0
+    with _lock:
+        conn = get_connection()
+        with conn:
+            for pid, (score, rescore_at) in updates.items():
+                cur = conn.execute(
+                    "UPDATE posts SET final_score = ?, rescore_at = ? WHERE id = ?",
+                    (score, rescore_at, pid),
+                )
+                updated += cur.rowcount
+    return updated
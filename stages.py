@@ -0,0 +1,87 @@
+"""
+Small producer/consumer runner for the staged pipeline mode.
+Each stage is a function run by its own worker threads, connected to the next
+stage by a bounded queue, so a slow stage applies backpressure instead of
+letting work pile up. A stage drops an item by returning None.
+"""
+
+import queue
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Optional[Any]]
+    workers: int = 1
+
+
+def _worker(stage: Stage, workers: int, inbox: queue.Queue, outbox: Optional[queue.Queue],
+            finished: List[int], lock: threading.Lock, stop: threading.Event,
+            on_exit: Callable[[], None]):
+    while True:
+        item = inbox.get()
+        if item is _DONE:
+            inbox.put(_DONE)  # let sibling workers see it too
+            break
+        if stop.is_set():
+            on_exit()  # drain without doing more work
+            continue
+        try:
+            result = stage.fn(item)
+        except Exception:
+            print(f"❌ Stage {stage.name} failed:\n{traceback.format_exc()}")
+            result = None
+        if result is not None and outbox is not None:
+            outbox.put(result)
+        else:
+            on_exit()
+
+    # The last worker of a stage closes the next queue
+    with lock:
+        finished[0] += 1
+        last = finished[0] == workers
+    if last and outbox is not None:
+        outbox.put(_DONE)
+
+
+def run_stages(source: Iterable[Any], stages: List[Stage], queue_size: int = 1,
+               stop: Optional[threading.Event] = None,
+               on_exit: Optional[Callable[[], None]] = None):
+    """
+    Feed `source` through `stages` and block until everything has drained.
+    Setting `stop` makes the source and every stage stop picking up new work.
+    `on_exit` is called once per item when it leaves the pipeline (dropped,
+    failed or through the last stage), e.g. to release an in-flight slot.
+    """
+    stop = stop or threading.Event()
+    on_exit = on_exit or (lambda: None)
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    threads = []
+    for i, stage in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        workers = max(stage.workers, 1)
+        finished, lock = [0], threading.Lock()
+        for n in range(workers):
+            t = threading.Thread(
+                target=_worker,
+                args=(stage, workers, queues[i], outbox, finished, lock, stop, on_exit),
+                name=f"{stage.name}-{n}",
+                daemon=True,
+            )
+            t.start()
+            threads.append(t)
+
+    for item in source:
+        if stop.is_set():
+            break
+        queues[0].put(item)
+    queues[0].put(_DONE)
+
+    for t in threads:
+        t.join()
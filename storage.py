@@ -0,0 +1,30 @@
+"""
+Storage backend selection for the Redditory pipeline.
+Every backend module exposes the same functions:
+- add_posts(posts)
+- get_unposted(limit=None, min_score=0.0, screened=None)
+- mark_posted(pid, media_pk="")
+- mark_discarded(post_id)
+- record_verdicts({id: postworthy})
+- get_due_rescore(now, limit=None)
+- update_scores({id: (final_score, rescore_at)})
+Add a function here whenever the pipeline starts to require it from a backend.
+"""
+
+import importlib
+import os
+
+STORE_BACKEND = os.environ.get("FS_STORE_BACKEND", "csv").lower()
+
+BACKENDS = {
+    "csv": "csv_store",
+    "sqlite": "sqlite_store",
+}
+
+
+def get_backend(name: str = None):
+    """Return the backend module for `name` (defaults to FS_STORE_BACKEND)."""
+    name = (name or STORE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown store backend {name!r}; expected one of {sorted(BACKENDS)}")
+    return importlib.import_module(BACKENDS[name])
@@ -0,0 +1,264 @@
+"""
+Persistent Instagram upload queue.
+
+Jobs (post id, slides, caption) are logged in a SQLite file before anything is
+uploaded, and their slides are moved into UPLOAD_DIR/<post id>/, so a failed
+or interrupted upload is retried later without re-rendering or re-captioning.
+An Uploader thread works through due jobs with exponential backoff.
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+UPLOAD_QUEUE_FILE = os.environ.get("FS_UPLOAD_QUEUE_FILE", "upload_jobs.db")
+UPLOAD_DIR = Path(os.environ.get("FS_UPLOAD_DIR", "upload_jobs"))
+UPLOAD_MAX_ATTEMPTS = int(os.environ.get("FS_UPLOAD_MAX_ATTEMPTS", "6"))
+# Retry delay is UPLOAD_BACKOFF * 2**(attempts-1) seconds, capped at UPLOAD_BACKOFF_MAX
+UPLOAD_BACKOFF = float(os.environ.get("FS_UPLOAD_BACKOFF", "60"))
+UPLOAD_BACKOFF_MAX = float(os.environ.get("FS_UPLOAD_BACKOFF_MAX", "3600"))
+# An uploading job whose owner has not renewed its lease for this long is requeued
+UPLOAD_LEASE_SECONDS = float(os.environ.get("FS_UPLOAD_LEASE", "300"))
+
+PENDING, UPLOADING, DONE, FAILED = "pending", "uploading", "done", "failed"
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.RLock()
+# Set whenever a job is enqueued so an idle Uploader wakes up
+_wakeup = threading.Event()
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(UPLOAD_QUEUE_FILE, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, slides TEXT NOT NULL, caption TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at REAL NOT NULL, last_error TEXT, media_pk TEXT, owner TEXT, "
+            "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        columns = {r[1] for r in conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, next_attempt_at)")
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _job(row) -> Dict[str, Any]:
+    job = dict(row)
+    job["paths"] = json.loads(job.pop("slides"))
+    return job
+
+
+def enqueue(post_id: str, img_paths: List[str], caption: str) -> Dict[str, Any]:
+    """Move the slides into the upload directory and log a pending job."""
+    path = UPLOAD_DIR / post_id
+    path.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i, src in enumerate(img_paths, start=1):
+        dst = path / f"{i}{Path(src).suffix or '.jpg'}"
+        if Path(src).resolve() != dst.resolve():
+            shutil.move(src, dst)
+        paths.append(str(dst))
+
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, slides, caption, status, attempts, next_attempt_at, "
+                "last_error, media_pk, owner, created_at, updated_at) VALUES (?, ?, ?, ?, 0, ?, NULL, NULL, NULL, ?, ?)",
+                (post_id, json.dumps(paths), caption, PENDING, now, now, now),
+            )
+    _wakeup.set()
+    return {"id": post_id, "paths": paths, "caption": caption, "status": PENDING, "attempts": 0}
+
+
+def recover(now: Optional[float] = None) -> int:
+    """
+    Requeue 'uploading' jobs whose lease expired, i.e. their uploader crashed
+    or was killed. Returns how many were requeued.
+    """
+    now = time.time() if now is None else now
+    with _lock:
+        conn = _connection()
+        with conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (PENDING, now, UPLOADING, now - UPLOAD_LEASE_SECONDS),
+            )
+    return cur.rowcount
+
+
+def claim_due(owner: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Lease the oldest due pending job to `owner` and return it."""
+    now = time.time() if now is None else now
+    with _lock:
+        conn = _connection()
+        rows = conn.execute(
+            "SELECT * FROM jobs WHERE status = ? AND next_attempt_at <= ? ORDER BY next_attempt_at LIMIT 5",
+            (PENDING, now),
+        ).fetchall()
+        for row in rows:
+            with conn:
+                # Conditional update: another process may have claimed it since the SELECT
+                cur = conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?",
+                    (UPLOADING, owner, now, row["id"], PENDING),
+                )
+            if cur.rowcount:
+                return _job(row)
+    return None
+
+
+def renew(post_id: str, owner: str):
+    """Heartbeat: extend `owner`'s lease on an uploading job."""
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (time.time(), post_id, UPLOADING, owner),
+            )
+
+
+def next_due_at() -> Optional[float]:
+    with _lock:
+        row = _connection().execute(
+            "SELECT MIN(next_attempt_at) FROM jobs WHERE status = ?", (PENDING,)
+        ).fetchone()
+    return row[0]
+
+
+def pending_ids() -> List[str]:
+    """Posts with an upload still pending or in progress."""
+    with _lock:
+        rows = _connection().execute(
+            "SELECT id FROM jobs WHERE status IN (?, ?)", (PENDING, UPLOADING)
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def complete(post_id: str, media_pk: str):
+    with _lock:
+        conn = _connection()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, media_pk = ?, owner = NULL, updated_at = ? WHERE id = ?",
+                (DONE, media_pk, time.time(), post_id),
+            )
+    shutil.rmtree(UPLOAD_DIR / post_id, ignore_errors=True)
+
+
+def fail(post_id: str, error: str) -> str:
+    """Schedule a retry with exponential backoff, or give up after UPLOAD_MAX_ATTEMPTS. Returns the new status."""
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        row = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (post_id,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        status = FAILED if attempts >= UPLOAD_MAX_ATTEMPTS else PENDING
+        delay = min(UPLOAD_BACKOFF * 2 ** (attempts - 1), UPLOAD_BACKOFF_MAX)
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, owner = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, attempts, now + delay, error, now, post_id),
+            )
+    if status == FAILED:
+        shutil.rmtree(UPLOAD_DIR / post_id, ignore_errors=True)
+    return status
+
+
+class Uploader(threading.Thread):
+    """
+    Background worker: uploads due jobs one at a time with `upload_fn(job) -> media pk`
+    and reports success through `on_done(job, media_pk)`.
+    """
+
+    def __init__(self, upload_fn: Callable[[Dict[str, Any]], str],
+                 on_done: Callable[[Dict[str, Any], str], None], poll_seconds: float = 30.0):
+        super().__init__(name="uploader", daemon=True)
+        self.upload_fn = upload_fn
+        self.on_done = on_done
+        self.poll_seconds = poll_seconds
+        self.uploaded = 0
+        # Lease owner id; jobs claimed by other processes are left alone
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stop_event = threading.Event()
+        self._idle = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            # Cleared before looking at the queue so an enqueue in between still wakes us
+            _wakeup.clear()
+            recover()
+            job = claim_due(self.owner)
+            if job is None:
+                self._idle.set()
+                due = next_due_at()
+                wait = self.poll_seconds if due is None else min(max(due - time.time(), 0.05), self.poll_seconds)
+                _wakeup.wait(wait)
+                continue
+            self._idle.clear()
+            self._upload(job)
+
+    def _heartbeat(self, post_id: str, done: threading.Event):
+        while not done.wait(UPLOAD_LEASE_SECONDS / 5):
+            renew(post_id, self.owner)
+
+    def _upload(self, job: Dict[str, Any]):
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job["id"], done), name="upload-lease", daemon=True).start()
+        try:
+            media_pk = self.upload_fn(job)
+        except Exception as e:
+            status = fail(job["id"], str(e))
+            retry = "giving up" if status == FAILED else "will retry"
+            print(f"❌ Upload of {job['id']} failed ({retry}): {e}")
+            return
+        finally:
+            done.set()
+        try:
+            self.on_done(job, media_pk)
+        except Exception:
+            print(f"❌ Recording upload of {job['id']} failed:\n{traceback.format_exc()}")
+        complete(job["id"], media_pk)
+        self.uploaded += 1
+
+    def drain(self, timeout: float) -> bool:
+        """
+        Wait up to `timeout` seconds for every job that is due before the
+        deadline, then stop. Returns True if nothing is left pending.
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            due = next_due_at()
+            if due is None or due > deadline:
+                if self._idle.is_set() and not _busy(self.owner):
+                    break
+            time.sleep(0.1)
+        self._stop_event.set()
+        _wakeup.set()
+        self.join(timeout=max(deadline - time.time(), 0) + 1)
+        return not pending_ids()
+
+
+def _busy(owner: str) -> bool:
+    with _lock:
+        row = _connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND owner = ?", (UPLOADING, owner)
+        ).fetchone()
+    return row[0] > 0